@@ -0,0 +1,2 @@
+# Benchmarks for the site generator. Run from the repository root with
+# ./bench.sh (or `python3 -m benchmarks` from src/); see __main__.py.
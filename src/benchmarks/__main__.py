@@ -0,0 +1,54 @@
+import argparse
+import json
+import sys
+
+from benchmarks.e2e import format_e2e, run_e2e
+from benchmarks.micro import format_micro, run_micro
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",") if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="Micro-benchmarks and end-to-end builds on a synthetic corpus.",
+    )
+    parser.add_argument(
+        "suite", nargs="?", choices=("micro", "e2e", "all"), default="all"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--documents", type=int, default=50, help="documents in the micro corpus"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=[1000, 10000, 100000],
+        help="comma-separated page counts for end-to-end builds",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the generated sites on disk"
+    )
+    parser.add_argument("--json", help="also write the raw results to this file")
+    args = parser.parse_args(argv)
+
+    report = {"seed": args.seed}
+    if args.suite in ("micro", "all"):
+        report["micro"] = run_micro(args.seed, args.documents, args.repeat)
+        print(format_micro(report["micro"]))
+    if args.suite in ("e2e", "all"):
+        if "micro" in report:
+            print()
+        report["e2e"] = run_e2e(args.sizes, args.seed, args.jobs, args.keep)
+        print(format_e2e(report["e2e"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
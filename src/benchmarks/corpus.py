@@ -0,0 +1,128 @@
+import os
+import random
+
+# A fixed vocabulary keeps generated text free of Markdown delimiters, so
+# every document the generator produces is valid input for the parser
+WORDS = (
+    "the ring of power was forged in the fires of mount doom while elves "
+    "and men stood together against the shadow that grew in the east and "
+    "the hobbits of the shire knew nothing of the road that lay ahead"
+).split()
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline_text(rng, count, density):
+    # Roughly `density` of the spans carry markup of some kind
+    parts = []
+    for _ in range(count):
+        if rng.random() >= density:
+            parts.append(words(rng, rng.randint(1, 6)))
+            continue
+        kind = rng.randrange(5)
+        text = words(rng, rng.randint(1, 3))
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"_{text}_")
+        elif kind == 2:
+            parts.append(f"`{text}`")
+        elif kind == 3:
+            parts.append(f"[{text}](/blog/{rng.choice(WORDS)}/)")
+        else:
+            parts.append(f"![{text}](/images/{rng.choice(WORDS)}.png)")
+    return " ".join(parts)
+
+
+def block(rng, kind, density):
+    if kind == "heading":
+        return "#" * rng.randint(2, 6) + " " + inline_text(rng, 2, density)
+    if kind == "paragraph":
+        lines = [inline_text(rng, rng.randint(3, 8), density) for _ in range(3)]
+        return "\n".join(lines)
+    if kind == "quote":
+        count = rng.randint(1, 4)
+        return "\n".join("> " + inline_text(rng, 3, density) for _ in range(count))
+    if kind == "unordered_list":
+        count = rng.randint(2, 8)
+        return "\n".join("- " + inline_text(rng, 2, density) for _ in range(count))
+    if kind == "ordered_list":
+        count = rng.randint(2, 8)
+        return "\n".join(
+            f"{i + 1}. " + inline_text(rng, 2, density) for i in range(count)
+        )
+    if kind == "code":
+        lines = [words(rng, rng.randint(2, 8)) for _ in range(rng.randint(2, 10))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    raise ValueError(f"unknown block kind: {kind}")
+
+
+BLOCK_KINDS = (
+    "heading",
+    "paragraph",
+    "quote",
+    "unordered_list",
+    "ordered_list",
+    "code",
+)
+# Paragraphs dominate real pages
+BLOCK_WEIGHTS = (2, 10, 1, 2, 2, 1)
+
+
+def generate_document(rng, blocks=30, density=0.3):
+    parts = ["# " + words(rng, rng.randint(2, 6))]
+    for kind in rng.choices(BLOCK_KINDS, BLOCK_WEIGHTS, k=blocks):
+        parts.append(block(rng, kind, density))
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(seed=0, documents=50, blocks=30, density=0.3):
+    rng = random.Random(seed)
+    return [generate_document(rng, blocks, density) for _ in range(documents)]
+
+
+def generate_inline_samples(seed=0, count=1000, density=0.5):
+    rng = random.Random(seed)
+    return [inline_text(rng, rng.randint(4, 12), density) for _ in range(count)]
+
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def generate_site(root, pages, seed=0, blocks=30, density=0.3, large_every=100):
+    # content/section-NNN/page-NNNNNN/index.md, 100 pages per section, with
+    # every `large_every`-th page ten times longer than the rest
+    rng = random.Random(seed)
+    content_dir = os.path.join(root, "content")
+    for number in range(pages):
+        page_dir = os.path.join(
+            content_dir, f"section-{number // 100:03d}", f"page-{number:06d}"
+        )
+        os.makedirs(page_dir, exist_ok=True)
+        size = blocks * 10 if large_every and number % large_every == 0 else blocks
+        with open(os.path.join(page_dir, "index.md"), "w") as f:
+            f.write(generate_document(rng, size, density))
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+    static_dir = os.path.join(root, "static", "images")
+    os.makedirs(static_dir, exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+    for word in sorted(set(WORDS)):
+        with open(os.path.join(static_dir, f"{word}.png"), "wb") as f:
+            f.write(rng.randbytes(256))
+    return content_dir, template_path
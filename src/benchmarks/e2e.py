@@ -0,0 +1,79 @@
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_site
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_once(root, jobs):
+    # Runs inside a fresh interpreter (see run_e2e) so ru_maxrss is the peak
+    # of this build alone
+    from main import build_pages, collect_pages
+
+    content_dir = os.path.join(root, "content")
+    template_path = os.path.join(root, "template.html")
+    dest_dir = os.path.join(root, "docs")
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            pages = collect_pages(content_dir, dest_dir)
+            build_pages(pages, template_path, "/", jobs=jobs)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {"pages": len(pages), "seconds": elapsed, "peak_rss_bytes": peak}
+
+
+def run_e2e(sizes, seed=0, jobs=1, keep=False):
+    results = []
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix=f"ssg-bench-{size}-")
+        try:
+            generate_site(root, size, seed)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.e2e", root, str(jobs)],
+                cwd=SRC_DIR,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output)
+            result["pages_per_second"] = result["pages"] / result["seconds"]
+            result["jobs"] = jobs
+            results.append(result)
+        finally:
+            if keep:
+                print(f"kept {root}")
+            else:
+                shutil.rmtree(root)
+    return results
+
+
+def format_e2e(results):
+    lines = [
+        f"{'pages':>8} {'jobs':>5} {'time (s)':>9} {'pages/s':>9} {'peak RSS':>10}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result['pages']:>8} {result['jobs']:>5} {result['seconds']:>9.2f} "
+            f"{result['pages_per_second']:>9.0f} "
+            f"{result['peak_rss_bytes'] / (1 << 20):>8.1f}MB"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(json.dumps(build_once(sys.argv[1], int(sys.argv[2]))))
@@ -0,0 +1,66 @@
+import time
+
+from benchmarks.corpus import generate_corpus, generate_inline_samples
+from inline_markdown import (
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+
+
+def best_time(func, inputs, repeat):
+    # Best of `repeat` passes over all inputs, the least noisy estimate
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_micro(seed=0, documents=50, repeat=5):
+    docs = generate_corpus(seed, documents)
+    large_docs = generate_corpus(seed + 1, max(1, documents // 10), blocks=500)
+    inline = generate_inline_samples(seed)
+    dense_inline = generate_inline_samples(seed, density=0.9)
+    blocks = [block for doc in docs for block in markdown_to_blocks(doc)]
+    nodes = [markdown_to_html_node(doc) for doc in docs]
+    doc_bytes = sum(len(doc.encode()) for doc in docs)
+
+    cases = [
+        ("text_to_textnodes", text_to_textnodes, inline, "lines"),
+        ("text_to_textnodes (dense)", text_to_textnodes, dense_inline, "lines"),
+        ("markdown_to_blocks", markdown_to_blocks, docs, "docs"),
+        ("block_to_block_type", block_to_block_type, blocks, "blocks"),
+        ("markdown_to_html_node", markdown_to_html_node, docs, "docs"),
+        ("markdown_to_html_node (large)", markdown_to_html_node, large_docs, "docs"),
+        ("to_html", lambda node: node.to_html(), nodes, "docs"),
+    ]
+    results = []
+    for name, func, inputs, unit in cases:
+        elapsed = best_time(func, inputs, repeat)
+        results.append(
+            {
+                "name": name,
+                "items": len(inputs),
+                "unit": unit,
+                "seconds": elapsed,
+                "per_second": len(inputs) / elapsed if elapsed else float("inf"),
+            }
+        )
+    return {"corpus_bytes": doc_bytes, "results": results}
+
+
+def format_micro(report):
+    lines = [f"{'benchmark':32} {'items':>7} {'time (ms)':>10} {'rate':>18}"]
+    for result in report["results"]:
+        rate = f"{result['per_second']:,.0f} {result['unit']}/s"
+        lines.append(
+            f"{result['name']:32} {result['items']:>7} "
+            f"{result['seconds'] * 1000:>10.2f} {rate:>18}"
+        )
+    return "\n".join(lines)
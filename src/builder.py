@@ -0,0 +1,183 @@
+import os
+
+import links
+import log
+import parse_cache
+import profiling
+import search
+from htmlnode import iter_html, write_html
+from inline_markdown import document_text, markdown_to_document
+from static_sync import list_files
+from template import Template, load_template
+
+logger = log.get_logger("build")
+
+
+def render_page(markdown, template):
+    # Markdown in, finished page (bytes) out. Nothing here touches the page
+    # files, so reading and writing can happen on other threads.
+    return render_document(markdown, template)[0]
+
+
+def render_document(markdown, template, collect=()):
+    # render_page, also returning the page's page_info, with the extras
+    # named in collect
+    parts = []
+    info = write_document(markdown, template, parts, collect)
+    return "".join(parts).encode("utf-8"), info
+
+
+def write_document(markdown, template, sink, collect=()):
+    # Streams the page into sink, a list buffer or anything with a write()
+    # method (output.OutputWriter writes it to disk as it comes), and
+    # returns its page_info
+
+    # Title and front matter come out of the same parse as the body. A page
+    # parsed before, by any build sharing the parse cache, comes back
+    # already serialized.
+    cache = parse_cache.active
+    if cache is not None and not parse_cache.cacheable(markdown):
+        cache = None
+    body = None
+    pieces = None
+    if cache is not None:
+        with profiling.stage("parse cache"):
+            key = cache.key(markdown)
+            cached = cache.get(key)
+        if cached is not None:
+            document, pieces = cached
+            body = parse_cache.join_body(pieces, template.basepath)
+    if body is None:
+        document = markdown_to_document(markdown)
+    if document.title is None:
+        raise ValueError("no h1 header")
+    if body is None and cache is not None:
+        with profiling.stage("serialize"):
+            pieces = parse_cache.body_parts(document.node)
+            body = parse_cache.join_body(pieces, template.basepath)
+        with profiling.stage("parse cache"):
+            cache.put(key, document, pieces)
+
+    if profiling.active is None:
+        if body is None:
+            body = iter_html(document.node, template.basepath)
+        template.write(sink, Title=document.title, Content=body)
+    else:
+        # Streaming interleaves serializing and filling, so when profiling
+        # each one runs to completion on its own
+        if body is None:
+            with profiling.stage("serialize"):
+                body = []
+                write_html(document.node, body, template.basepath)
+        with profiling.stage("template fill"):
+            template.write(sink, Title=document.title, Content=body)
+    return page_info(document, collect, markdown, pieces)
+
+
+def page_info(document, collect=(), markdown=None, pieces=None):
+    # What the sitemap and feed need to know about a page, kept in the
+    # build manifest so pages skipped by later builds still have it. collect
+    # can also ask for what is taken from the same parse:
+    #   "terms"  words for the search index
+    #   "links"  [url, line] for every root-relative link, for check-links;
+    #            needs the Markdown and, without a tree, the cached pieces
+    info = {"title": document.title, "date": document.metadata.get("date")}
+    if "terms" in collect:
+        with profiling.stage("search terms"):
+            info["terms"] = search.page_terms(document_text(document))
+    if "links" in collect:
+        with profiling.stage("links"):
+            if document.node is not None:
+                urls = links.node_links(document.node)
+            else:
+                urls = links.piece_links(pieces)
+            info["links"] = links.link_lines(markdown, urls)
+    return info
+
+
+def output_path_for(rel_path):
+    # Same mapping as the command line build, content/a/b.md -> a/b.html,
+    # with "/" separators on every platform
+    return os.path.splitext(rel_path)[0].replace(os.sep, "/") + ".html"
+
+
+def _read(data, path, mode):
+    if path is None:
+        return data
+    with open(path, mode) as f:
+        return f.read()
+
+
+class Site:
+    # A site built in memory, for embedding the generator (e.g. rendering
+    # previews in a service): pages and static files are given as text or
+    # as paths, and build() returns {output path: bytes} without writing
+    # any file or printing anything. Paths are only read when build() runs,
+    # so the same Site can be built again after they change.
+    def __init__(self, template=None, template_path=None, basepath="/"):
+        if (template is None) == (template_path is None):
+            raise ValueError("give either the template text or template_path")
+        if template_path is not None:
+            self.template = load_template(template_path, basepath)
+        else:
+            self.template = Template(template, basepath)
+        # output path -> (text or None, source path or None)
+        self.pages = {}
+        self.assets = {}
+
+    @property
+    def basepath(self):
+        return self.template.basepath
+
+    def add_page(self, output_path, markdown=None, path=None):
+        if (markdown is None) == (path is None):
+            raise ValueError("give either the page's Markdown or its path")
+        self.pages[output_path] = (markdown, path)
+
+    def add_content(self, directory):
+        # Every Markdown file under directory, at the path the command line
+        # build would write it to
+        for rel_path in list_files(directory):
+            if rel_path.endswith(".md"):
+                self.add_page(
+                    output_path_for(rel_path), path=os.path.join(directory, rel_path)
+                )
+
+    def add_asset(self, output_path, data=None, path=None):
+        if (data is None) == (path is None):
+            raise ValueError("give either the asset's data or its path")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.assets[output_path] = (data, path)
+
+    def add_static(self, directory):
+        for rel_path in list_files(directory):
+            self.add_asset(
+                rel_path.replace(os.sep, "/"), path=os.path.join(directory, rel_path)
+            )
+
+    def render(self, markdown):
+        # One page, straight from its Markdown
+        return render_page(markdown, self.template)
+
+    def build(self):
+        # {output path: bytes} for every asset and page, assets first so a
+        # page wins over a static file at the same path, as it does on disk
+        outputs = {}
+        for output_path, (data, path) in self.assets.items():
+            outputs[output_path] = _read(data, path, "rb")
+        for output_path, (markdown, path) in self.pages.items():
+            markdown = _read(markdown, path, "r")
+            try:
+                outputs[output_path] = render_page(markdown, self.template)
+            except ValueError as e:
+                raise ValueError(f"{path or output_path}: {e}") from e
+        logger.debug(
+            "Built %d pages and %d assets in memory",
+            len(self.pages),
+            len(self.assets),
+            extra=log.fields(
+                event="site_built", pages=len(self.pages), assets=len(self.assets)
+            ),
+        )
+        return outputs
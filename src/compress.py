@@ -0,0 +1,143 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import log
+from static_sync import list_files
+
+# zstd is optional: the standard library has it from Python 3.14, older
+# versions need the zstandard package. Without either, no .zst files are made.
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = log.get_logger("compress")
+
+# Text outputs worth precompressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".txt", ".js", ".json", ".xml", ".svg")
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the .gz identical from build to build
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def zstd_bytes(data):
+    if zstd is not None:
+        return zstd.compress(data, level=19)
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+
+def available_encodings():
+    # (suffix, compress function) for every format this Python can produce
+    encodings = [(".gz", gzip_bytes)]
+    if zstd is not None or zstandard is not None:
+        encodings.append((".zst", zstd_bytes))
+    return encodings
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress_file(path, encodings, known=None):
+    # Write a sibling per encoding unless the one on disk was made from the
+    # current file: siblings carry their source's mtime, and unchanged
+    # outputs keep theirs. known is the incompressible record of an earlier
+    # build ([size, mtime_ns, suffixes]); encodings it lists are skipped
+    # while the file is unchanged. Returns (siblings written, the record to
+    # keep, or None).
+    st = os.stat(path)
+    skip = ()
+    if known is not None and known[:2] == [st.st_size, st.st_mtime_ns]:
+        skip = known[2]
+    data = None
+    written = 0
+    no_gain = []
+    for suffix, compress_bytes in encodings:
+        if suffix in skip:
+            no_gain.append(suffix)
+            continue
+        sibling = path + suffix
+        try:
+            if os.stat(sibling).st_mtime_ns == st.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = compress_bytes(data)
+        if len(compressed) >= len(data):
+            # No smaller than the original: let the server send that instead
+            if os.path.exists(sibling):
+                os.remove(sibling)
+            no_gain.append(suffix)
+            continue
+        tmp_path = sibling + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp_path, sibling)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        written += 1
+    if not no_gain:
+        return written, None
+    return written, [st.st_size, st.st_mtime_ns, no_gain]
+
+
+def compress_outputs(dest_dir, jobs=None, encodings=None, manifest=None):
+    # Precompress every text output in dest_dir in parallel (zlib and zstd
+    # release the GIL, so threads are enough) and delete siblings whose
+    # output is gone. With a manifest, files found not worth compressing are
+    # remembered in it. Returns (siblings written, siblings removed).
+    encodings = encodings if encodings is not None else available_encodings()
+    suffixes = tuple(suffix for suffix, _ in encodings)
+    files = list_files(dest_dir)
+    existing = set(files)
+
+    removed = 0
+    for rel_path in files:
+        base, suffix = os.path.splitext(rel_path)
+        if suffix in suffixes and is_compressible(base) and base not in existing:
+            os.remove(os.path.join(dest_dir, rel_path))
+            removed += 1
+
+    targets = [rel_path for rel_path in files if is_compressible(rel_path)]
+    previous = manifest.incompressible if manifest is not None else {}
+
+    def compress_target(rel_path):
+        path = os.path.join(dest_dir, rel_path)
+        return compress_file(path, encodings, previous.get(rel_path))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(compress_target, targets))
+    written = sum(count for count, _ in results)
+    if manifest is not None:
+        manifest.incompressible = {
+            rel_path: record
+            for rel_path, (_, record) in zip(targets, results)
+            if record is not None
+        }
+
+    names = ", ".join(suffix.lstrip(".") for suffix in suffixes)
+    logger.info(
+        "Precompressed (%s): %d written, %d removed, %d text files checked.",
+        names,
+        written,
+        removed,
+        len(targets),
+        extra=log.fields(
+            event="compressed", written=written, removed=removed, checked=len(targets)
+        ),
+    )
+    return written, removed
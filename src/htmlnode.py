@@ -1,10 +1,40 @@
+import sys
+
+# Attributes holding a URL; root-relative ones get the site's basepath
+URL_ATTRIBUTES = ("href", "src")
+
+
+def prefix_url(url, basepath):
+    # "/blog/" under basepath "/repo/" becomes "/repo/blog/". Relative,
+    # absolute and protocol-relative ("//host/...") URLs are left alone.
+    if basepath == "/" or not url.startswith("/") or url.startswith("//"):
+        return url
+    return basepath + url[1:]
+
+
 class HTMLNode:
+    # __slots__ drops the per-instance __dict__; a page holds thousands of
+    # nodes, so this is most of their memory
+    __slots__ = ("tag", "value", "children", "_props", "_props_html")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # Tags repeat on every page; interning shares one string per tag name
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
         self.props = props
 
+    @property
+    def props(self):
+        return self._props
+
+    @props.setter
+    def props(self, props):
+        # The attribute string is built on first use and kept; assigning new
+        # props resets it (mutate a props dict in place and it goes stale)
+        self._props = props
+        self._props_html = None
+
     def __eq__(self, other):
         if not isinstance(other, HTMLNode):
             return False
@@ -18,21 +48,33 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError
 
-    def props_to_html(self):
-        if not self.props:
-            return ""
-
-        items = []
-        for key, value in self.props.items():
-            items.append(f'{key}="{value}"')
-
-        return " " + " ".join(items)
+    def props_to_html(self, basepath="/"):
+        # Cached as (basepath, html): a build renders with one basepath
+        cached = self._props_html
+        if cached is not None and cached[0] == basepath:
+            return cached[1]
+        props = self._props
+        if not props:
+            props_html = ""
+        elif basepath != "/" and ("href" in props or "src" in props):
+            props_html = "".join(
+                f' {key}="{prefix_url(value, basepath)}"'
+                if key in URL_ATTRIBUTES
+                else f' {key}="{value}"'
+                for key, value in props.items()
+            )
+        else:
+            props_html = "".join(f' {key}="{value}"' for key, value in props.items())
+        self._props_html = (basepath, props_html)
+        return props_html
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
@@ -47,19 +89,21 @@ class LeafNode(HTMLNode):
             and other.children is None
         )
 
-    def to_html(self):
+    def to_html(self, basepath="/"):
         if self.value is None:
             raise ValueError("LeafNode requires a value.")
         if self.tag is None:
             return self.value
 
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(basepath)}>{self.value}</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
@@ -74,13 +118,57 @@ class ParentNode(HTMLNode):
             and other.value is None
         )
 
-    def to_html(self):
+    def to_html(self, basepath="/"):
         if self.tag is None:
             raise ValueError("ParentNode requires a tag.")
         if not self.children:
             raise ValueError("ParentNode requires a child.")
 
-        return f"<{self.tag}{self.props_to_html()}>{''.join([child.to_html() for child in self.children])}</{self.tag}>"
+        return "".join(iter_html(self, basepath))
 
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
+
+
+def iter_html(node, basepath="/"):
+    # Yields the HTML for a tree chunk by chunk. An explicit stack replaces
+    # recursion, so deep trees cannot hit the recursion limit and text is
+    # never copied into an intermediate string per nesting level. The
+    # basepath is applied to href/src attributes as they are written, so
+    # text that merely looks like an attribute (in code blocks) is untouched.
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):  # closing tag pushed by its ParentNode
+            yield item
+        elif isinstance(item, ParentNode):
+            if item.tag is None:
+                raise ValueError("ParentNode requires a tag.")
+            if not item.children:
+                raise ValueError("ParentNode requires a child.")
+            yield f"<{item.tag}{item.props_to_html(basepath)}>"
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        elif isinstance(item, LeafNode):
+            yield item.to_html(basepath)
+        else:
+            yield item.to_html()
+
+
+def iter_text(node):
+    # The text of every leaf in document order, without any markup: what a
+    # reader sees, for the search index
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ParentNode):
+            stack.extend(reversed(item.children))
+        elif item.value:
+            yield item.value
+
+
+def write_html(node, sink, basepath="/"):
+    # sink is either a list used as a buffer or anything with a write() method
+    write = sink.append if isinstance(sink, list) else sink.write
+    for chunk in iter_html(node, basepath):
+        write(chunk)
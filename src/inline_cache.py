@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = 4096
+
+# The cache for this process, or None while caching is off. Set by enable();
+# --jobs workers get their own through the pool initializer.
+active = None
+
+
+class InlineCache:
+    # Least-recently-used map from raw inline text to the leaf nodes parsed
+    # from it. A lock guards every access so threads can share one cache.
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        if maxsize < 1:
+            raise ValueError("cache size must be at least 1")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Entries held by each --jobs worker's own cache, by process id
+        self.worker_entries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, text):
+        with self.lock:
+            nodes = self.entries.get(text)
+            if nodes is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(text)
+            self.hits += 1
+            return nodes
+
+    def put(self, text, nodes):
+        with self.lock:
+            self.entries[text] = nodes
+            self.entries.move_to_end(text)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def take_stats(self):
+        # Counts since the last call and the current size, so workers can
+        # report per page
+        with self.lock:
+            stats = (self.hits, self.misses, len(self.entries))
+            self.hits = self.misses = 0
+            return stats
+
+    def add_stats(self, hits, misses, entries=None, worker=None):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            if worker is not None:
+                self.worker_entries[worker] = entries
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        if self.worker_entries:
+            size = (
+                f"{sum(self.worker_entries.values())} entries in "
+                f"{len(self.worker_entries)} worker caches of {self.maxsize}"
+            )
+        else:
+            size = f"{len(self.entries)}/{self.maxsize} entries"
+        return (
+            f"Inline cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.1f}% hit rate), {size}"
+        )
+
+
+def enable(maxsize=DEFAULT_SIZE):
+    global active
+    active = InlineCache(maxsize)
+    return active
+
+
+def disable():
+    global active
+    active = None
@@ -1,9 +1,13 @@
 import re
+import time
 
 from textnode import TextNode, TextType, text_node_to_html_node
 from htmlnode import *
 from enum import Enum
 
+import inline_cache
+import profiling
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -47,106 +51,219 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_nodes
 
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
 def extract_markdown_images(text):
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    return LINK_PATTERN.findall(text)
 
 
-def split_nodes_image(old_nodes):
+def split_nodes_pattern(old_nodes, pattern, text_type):
+    # Slice each text node once at the match offsets, rather than searching
+    # the rest of the text again for every match
     new_nodes = []
     for old_node in old_nodes:
         if old_node.text_type != TextType.TEXT:
             new_nodes.append(old_node)
             continue
-        original_text = old_node.text
-        images = extract_markdown_images(original_text)
-        if len(images) == 0:
+        text = old_node.text
+        position = 0
+        for match in pattern.finditer(text):
+            start = match.start()
+            if start > position:
+                new_nodes.append(TextNode(text[position:start], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            position = match.end()
+        if position == 0:
             new_nodes.append(old_node)
-            continue
-        for image in images:
-            sections = original_text.split(f"![{image[0]}]({image[1]})", 1)
-            if len(sections) != 2:
-                raise ValueError("invalid markdown, image section not closed")
-            if sections[0] != "":
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            new_nodes.append(
-                TextNode(
-                    image[0],
-                    TextType.IMAGE,
-                    image[1],
-                )
-            )
-            original_text = sections[1]
-        if original_text != "":
-            new_nodes.append(TextNode(original_text, TextType.TEXT))
+        elif position < len(text):
+            new_nodes.append(TextNode(text[position:], TextType.TEXT))
     return new_nodes
 
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    for old_node in old_nodes:
-        if old_node.text_type != TextType.TEXT:
-            new_nodes.append(old_node)
-            continue
-        original_text = old_node.text
-        links = extract_markdown_links(original_text)
-        if len(links) == 0:
-            new_nodes.append(old_node)
-            continue
-        for link in links:
-            sections = original_text.split(f"[{link[0]}]({link[1]})", 1)
-            if len(sections) != 2:
-                raise ValueError("invalid markdown, link section not closed")
-            if sections[0] != "":
-                new_nodes.append(TextNode(sections[0], TextType.TEXT))
-            new_nodes.append(TextNode(link[0], TextType.LINK, link[1]))
-            original_text = sections[1]
-        if original_text != "":
-            new_nodes.append(TextNode(original_text, TextType.TEXT))
-    return new_nodes
+def split_nodes_image(old_nodes):
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
 
-def text_to_textnodes(text):
-    new_nodes = [TextNode(text, TextType.TEXT)]
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", TextType.ITALIC)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
-    new_nodes = split_nodes_image(new_nodes)
-    new_nodes = split_nodes_link(new_nodes)
-    return new_nodes
+def split_nodes_link(old_nodes):
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
 
 
-def markdown_to_blocks(markdown):
-    # 1. Strip leading/trailing whitespace from the entire document
-    stripped_markdown = markdown.strip()
+# Delimiters in order of precedence: "**" pairs are matched over the whole
+# text, "_" only outside bold, "`" only outside bold and italic
+DELIMITER_PATTERN = re.compile(r"\*\*|[_`]")
+IMAGE_OR_LINK_PATTERN = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
-    # Handle the case of an empty or whitespace-only input string
-    if not stripped_markdown:
-        return []
 
-    # 2. Split by two or more newlines (which constitute blank lines)
-    #    The key here is that .split('\n\n') will create empty strings
-    #    if there are more than two newlines.
-    raw_blocks = stripped_markdown.split("\n\n")
+def append_plain_text(nodes, text):
+    # Plain text is the only place images and links are recognised
+    if "[" not in text:
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+    position = 0
+    for match in IMAGE_OR_LINK_PATTERN.finditer(text):
+        if match.start() > position:
+            nodes.append(TextNode(text[position : match.start()], TextType.TEXT))
+        if match.group(1):
+            nodes.append(TextNode(match.group(2), TextType.IMAGE, match.group(3)))
+        else:
+            nodes.append(TextNode(match.group(2), TextType.LINK, match.group(3)))
+        position = match.end()
+    if position < len(text):
+        nodes.append(TextNode(text[position:], TextType.TEXT))
 
-    processed_blocks = []
-    for block in raw_blocks:
-        # 3. Strip leading/trailing whitespace from each individual block
-        cleaned_block = block.strip()
 
-        # 4. Filter out any blocks that became empty strings after stripping
-        #    This also handles the empty strings created by multiple '\n\n'
-        if cleaned_block:  # An empty string is "falsey"
-            processed_blocks.append(cleaned_block)
+def text_to_textnodes(text):
+    # One left-to-right scan that gives the same nodes as running
+    # split_nodes_delimiter for "**", "_" and "`", then split_nodes_image and
+    # split_nodes_link, without building the intermediate lists.
+    nodes = []
+    if "**" not in text and "_" not in text and "`" not in text:
+        # Nothing to split on: at most images and links
+        if text:
+            append_plain_text(nodes, text)
+        return nodes
+
+    bold = italic = code = False
+    # Unterminated delimiters are reported in the order the staged pipeline
+    # would have found them, bold first
+    unterminated = set()
+    position = 0
+    for match in DELIMITER_PATTERN.finditer(text):
+        delimiter = match.group()
+        if bold and delimiter != "**":
+            continue  # everything up to the closing "**" is bold text
+        if italic and delimiter == "`":
+            continue  # backticks inside italics are literal
+
+        segment = text[position : match.start()]
+        if segment:
+            if bold:
+                nodes.append(TextNode(segment, TextType.BOLD))
+            elif italic:
+                nodes.append(TextNode(segment, TextType.ITALIC))
+            elif code:
+                nodes.append(TextNode(segment, TextType.CODE))
+            else:
+                append_plain_text(nodes, segment)
+
+        if delimiter == "**":
+            if italic:
+                unterminated.add("_")
+                italic = False
+            if code:
+                unterminated.add("`")
+                code = False
+            bold = not bold
+        elif delimiter == "_":
+            if code:
+                unterminated.add("`")
+                code = False
+            italic = not italic
+        else:
+            code = not code
+        position = match.end()
+
+    segment = text[position:]
+    if segment:
+        if bold:
+            nodes.append(TextNode(segment, TextType.BOLD))
+        elif italic:
+            nodes.append(TextNode(segment, TextType.ITALIC))
+        elif code:
+            nodes.append(TextNode(segment, TextType.CODE))
+        else:
+            append_plain_text(nodes, segment)
+
+    if bold:
+        unterminated.add("**")
+    if italic:
+        unterminated.add("_")
+    if code:
+        unterminated.add("`")
+    for delimiter in ("**", "_", "`"):
+        if delimiter in unterminated:
+            raise ValueError(
+                f"Invalid Markdown syntax: unterminated delimiter '{delimiter}'"
+            )
+    return nodes
+
+
+def find_fence_end(markdown, pos):
+    # pos is just past a line opening a ``` fence: return the end of the line
+    # that closes it, or -1 if the fence is never closed. Only lines holding
+    # a ``` are looked at.
+    length = len(markdown)
+    while True:
+        pos = markdown.find("```", pos)
+        if pos == -1:
+            return -1
+        line_end = markdown.find("\n", pos)
+        if line_end == -1:
+            line_end = length
+        if markdown[pos:line_end].rstrip().endswith("```"):
+            return line_end
+        pos = line_end + 1
+
+
+def iter_blocks(markdown, pos=0):
+    # Yields (block, kind) for every block in markdown[pos:], with
+    # surrounding whitespace removed. Blocks are separated by empty lines,
+    # except inside a closed ``` fence, which stays one block even if it
+    # contains blank lines. kind is BlockType.CODE for a block that is
+    # exactly one fence, otherwise None (classify it with
+    # block_to_block_type).
+    chunks = iter((markdown[pos:] if pos else markdown).split("\n\n"))
+    for chunk in chunks:
+        block = chunk.strip()
+        if not block:
+            continue
+        if not block.startswith("```"):
+            yield block, None
+            continue
+        # Only a block's first line can open a fence, which then swallows
+        # the following chunks up to the one holding its closing line
+        raw = chunk.lstrip()
+        line_end = raw.find("\n")
+        if line_end == -1:
+            line_end = len(raw)
+        first_line = raw[:line_end].rstrip()
+        if len(first_line) >= 6 and first_line.endswith("```"):
+            yield block, None
+            continue
+        # No line spans two chunks, so each swallowed chunk is searched on
+        # its own and the fence is joined once it is closed
+        fence_end = find_fence_end(raw, line_end + 1)
+        swallowed = [raw]
+        while fence_end == -1:
+            following = next(chunks, None)
+            if following is None:
+                break
+            swallowed.append(following)
+            fence_end = find_fence_end(following, 0)
+        if fence_end == -1:
+            # Never closed, so nothing after it can close a fence either:
+            # the swallowed chunks are ordinary blocks
+            yield block, None
+            for following in swallowed[1:]:
+                following = following.strip()
+                if following:
+                    yield following, None
+            continue
+        # Exactly one fence when nothing but whitespace follows the closing
+        # line in its chunk
+        fenced = not swallowed[-1][fence_end:].strip()
+        block = "\n\n".join(swallowed).rstrip()
+        yield block, BlockType.CODE if fenced else None
+
 
-    return processed_blocks
+def markdown_to_blocks(markdown):
+    return [block for block, _ in iter_blocks(markdown)]
 
 
 class BlockType(Enum):
@@ -158,60 +275,190 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
-def block_to_block_type(markdown):
+def every_line_starts_with(block, prefix):
+    # The first line is checked by the caller's dispatch; every other line
+    # starts right after a "\n"
+    return block.count("\n") == block.count("\n" + prefix)
 
-    # check for heading
-    if re.match(r"^#{1,6} ", markdown):
-        return BlockType.HEADING.value
 
-    # check for code block
-    if markdown.startswith("```") and markdown.endswith("```"):
-        return BlockType.CODE.value
+def classify_heading(block):
+    level = 1
+    while level < 7 and block.startswith("#", level):
+        level += 1
+    if level <= 6 and block.startswith(" ", level):
+        return BlockType.HEADING
+    return BlockType.PARAGRAPH
 
-    # split line into new lines based on '\n' syntax
-    lines = markdown.split("\n")
 
-    # check for quote (every line must start with a '> ')
-    if lines and all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE.value
+def classify_code(block):
+    if block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    return BlockType.PARAGRAPH
 
-    # check for unordered list (every line must start with a '- ')
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST.value
 
-    # check for ordered list (must be sequential, starting from 1)
-    if all(line.startswith(f"{i + 1}. ") for i, line in enumerate(lines)):
-        return BlockType.ORDERED_LIST.value
+def classify_quote(block):
+    if every_line_starts_with(block, ">"):
+        return BlockType.QUOTE
+    return BlockType.PARAGRAPH
 
-    # if none of the above, it's a paragraph
-    return BlockType.PARAGRAPH.value
 
+def classify_unordered_list(block):
+    if block.startswith("- ") and every_line_starts_with(block, "- "):
+        return BlockType.UNORDERED_LIST
+    return BlockType.PARAGRAPH
 
-def markdown_to_html_node(markdown):
+
+def classify_ordered_list(block):
+    # Items must be numbered 1, 2, 3... in order
+    number = 1
+    pos = 0
+    while True:
+        marker = str(number) + ". "
+        if not block.startswith(marker, pos):
+            return BlockType.PARAGRAPH
+        pos = block.find("\n", pos + len(marker))
+        if pos == -1:
+            return BlockType.ORDERED_LIST
+        pos += 1
+        number += 1
+
+
+# Every block type but paragraph is recognised by its first character, so
+# a block is checked against at most one rule
+BLOCK_CLASSIFIERS = {
+    "#": classify_heading,
+    "`": classify_code,
+    ">": classify_quote,
+    "-": classify_unordered_list,
+    "1": classify_ordered_list,
+}
+
+
+def block_to_block_type(markdown):
+    classify = BLOCK_CLASSIFIERS.get(markdown[:1])
+    if classify is None:
+        return BlockType.PARAGRAPH
+    return classify(markdown)
+
+
+class Document:
+    def __init__(
+        self, node, title=None, first_heading=None, metadata=None, text=None
+    ):
+        self.node = node  # the <div> ParentNode holding every block
+        self.title = title  # text of the first "# " heading, if any
+        self.first_heading = first_heading  # (level, text) of the first heading
+        self.metadata = metadata or {}  # key/value pairs from the front matter
+        # Plain text of the body, for documents loaded without their node
+        # (from the parse cache); see document_text
+        self.text = text
+
+    def __eq__(self, other):
+        if not isinstance(other, Document):
+            return False
+        return (
+            self.node == other.node
+            and self.title == other.title
+            and self.first_heading == other.first_heading
+            and self.metadata == other.metadata
+        )
+
+    def __repr__(self):
+        return (
+            f"Document({self.title}, {self.first_heading}, {self.metadata}, {self.node})"
+        )
+
+
+def document_text(document):
+    # The body's text, one leaf per line, whether or not the tree is loaded
+    if document.node is None:
+        return document.text or ""
+    return "\n".join(iter_text(document.node))
+
+
+def split_front_matter(markdown):
+    # Optional "key: value" lines between two "---" lines at the very top.
+    # Returns the metadata and the offset where the Markdown body starts.
+    if not markdown.startswith("---\n"):
+        return {}, 0
+    end = markdown.find("\n---", 3)
+    if end == -1:
+        return {}, 0
+    close_end = end + 4
+    if close_end < len(markdown) and markdown[close_end] != "\n":
+        return {}, 0  # "---something" is not a closing line
+
+    metadata = {}
+    for line in markdown[4:end].split("\n"):
+        key, sep, value = line.partition(":")
+        if not sep or not key.strip():
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        metadata[key.strip()] = value
+    return metadata, close_end
+
+
+def markdown_to_document(markdown):
+    # Parse once and collect what the rest of the build needs (title, first
+    # heading, front matter) along the way, so nothing has to re-read the file
+    metadata, body_start = split_front_matter(markdown)
     children = []
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        # print(f'CODE ELEMENTS: {[text_node_to_html_node(TextNode(block, TextType.CODE))]}', '\n')
-        # block = block.replace('\n', ' ')
-        block_type = block_to_block_type(block)
-        block_element = markdown_to_html_tags(block, block_type)
-        # print(block_element, 'haahahahahaXD\n')
-        children.append(block_element)
-        # print(f'CHILDREN TO HTML: {ParentNode('div', children).to_html()}', '\n')
-    return ParentNode("div", children)
+    title = None
+    first_heading = None
+    profiler = profiling.active
+    if profiler is not None:
+        blocks_start = time.perf_counter_ns()
+    blocks = iter_blocks(markdown, body_start)
+    while True:
+        # Blocks are split off as they are consumed
+        with profiling.accumulate("block split"):
+            block, kind = next(blocks, (None, None))
+        if block is None:
+            break
+        with profiling.accumulate("block classify"):
+            block_type = kind if kind is not None else block_to_block_type(block)
+        if block_type is BlockType.HEADING:
+            level = len(block) - len(block.lstrip("#"))
+            text = block[level + 1 :].split("\n", 1)[0].strip()
+            if first_heading is None:
+                first_heading = (level, text)
+            if title is None and level == 1:
+                title = text
+        with profiling.accumulate("tree build"):
+            children.append(markdown_to_html_tags(block, block_type))
+    if profiler is not None:
+        profiler.flush_totals(blocks_start)
+    if title is None and metadata.get("title"):
+        title = metadata["title"]
+    return Document(ParentNode("div", children), title, first_heading, metadata)
+
+
+def markdown_to_html_node(markdown):
+    return markdown_to_document(markdown).node
 
 
 def text_to_children(text):
+    cache = inline_cache.active
+    if cache is not None:
+        cached = cache.get(text)
+        if cached is not None:
+            # Leaf nodes are never modified once built, so pages can share them
+            return list(cached)
     leaf_nodes = []
-    text_nodes = text_to_textnodes(text)
+    with profiling.accumulate("inline parse"):
+        text_nodes = text_to_textnodes(text)
     for text_node in text_nodes:
         leaf_nodes.append(text_node_to_html_node(text_node))
+    if cache is not None:
+        cache.put(text, tuple(leaf_nodes))
     return leaf_nodes
 
 
 def markdown_to_html_tags(block, block_type):
     match block_type:
-        case "heading":
+        case BlockType.HEADING:
             if block.startswith("# "):
                 block = block.replace("# ", "", 1)
                 block_element = ParentNode("h1", text_to_children(block))
@@ -230,7 +477,7 @@ def markdown_to_html_tags(block, block_type):
             elif block.startswith("###### "):
                 block = block.replace("###### ", "", 1)
                 block_element = ParentNode("h6", text_to_children(block))
-        case "code":
+        case BlockType.CODE:
             content = block
             if content.startswith("```\n"):  # Handles ``` followed by newline
                 content = content[4:]
@@ -245,7 +492,7 @@ def markdown_to_html_tags(block, block_type):
             block_element = ParentNode(
                 "pre", [text_node_to_html_node(TextNode(content, TextType.CODE))]
             )
-        case "quote":
+        case BlockType.QUOTE:
             lines_in_block = block.split("\n")
             # print(lines_in_block)
             cleaned_content_lines = []
@@ -261,7 +508,7 @@ def markdown_to_html_tags(block, block_type):
             full_quote_content = " ".join(cleaned_content_lines)
             children_nodes = text_to_children(full_quote_content)
             block_element = ParentNode("blockquote", children_nodes)
-        case "unordered_list":
+        case BlockType.UNORDERED_LIST:
             child_blocks = []
             lines = block.split("\n")
             for line in lines:
@@ -275,7 +522,7 @@ def markdown_to_html_tags(block, block_type):
                     # Usually, content is expected after marker.
                     child_blocks.append(ParentNode("li", text_to_children(content)))
             block_element = ParentNode("ul", child_blocks)
-        case "ordered_list":
+        case BlockType.ORDERED_LIST:
             child_blocks = []
             ordered_list = block.split("\n")
             for i, line in enumerate(ordered_list):
@@ -0,0 +1,122 @@
+import bisect
+import logging
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+import log
+from htmlnode import URL_ATTRIBUTES, ParentNode
+
+logger = log.get_logger("links")
+
+
+def is_root_relative(url):
+    return url.startswith("/") and not url.startswith("//")
+
+
+def node_links(node):
+    # Root-relative href/src values in a parsed tree, in document order
+    urls = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        props = item.props
+        if props:
+            for key in URL_ATTRIBUTES:
+                url = props.get(key)
+                if url is not None and is_root_relative(url):
+                    urls.append(url)
+        if isinstance(item, ParentNode):
+            stack.extend(reversed(item.children))
+    return urls
+
+
+def piece_links(pieces):
+    # The same URLs from a body cut by parse_cache.body_parts: every piece
+    # after the first starts with one, up to its closing quote
+    return [piece[: piece.find('"')] for piece in pieces[1:]]
+
+
+def link_lines(markdown, urls):
+    # [url, line] pairs: the line of the source where each URL's "](url)"
+    # appears, repeated URLs taking their occurrences in order
+    line_starts = None
+    found = []
+    cursors = {}
+    for url in urls:
+        position = markdown.find(f"]({url})", cursors.get(url, 0))
+        if position == -1:
+            # Not written as a Markdown link (e.g. produced by the parser)
+            found.append([url, None])
+            continue
+        cursors[url] = position + 1
+        if line_starts is None:
+            line_starts = [0]
+            line_starts.extend(match.end() for match in re.finditer("\n", markdown))
+        found.append([url, bisect.bisect_right(line_starts, position)])
+    return found
+
+
+def link_target(url):
+    # Output path a root-relative URL is served from: "/blog/tom/?x#y" ->
+    # "blog/tom/index.html"
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if path.endswith("/"):
+        path += "index.html"
+    return posixpath.normpath(path).lstrip("/")
+
+
+def output_index(pages, assets, dest_dir, extra=()):
+    # Every path the site serves, relative to dest_dir with "/" separators:
+    # rendered pages, static assets and any other files the build wrote
+    index = set()
+    for dest_path in list(pages) + list(extra):
+        index.add(os.path.relpath(dest_path, dest_dir).replace(os.sep, "/"))
+    for rel_path in assets:
+        index.add(rel_path.replace(os.sep, "/"))
+    return index
+
+
+class LinkChecker:
+    # Resolves the root-relative links recorded for every page (in the
+    # build manifest, so pages skipped by this build are checked too)
+    # against the set of outputs: one lookup per link, no HTML is read.
+    # With fail=True a broken link fails the build.
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def check(self, pages, assets, dest_dir, extra=()):
+        # Returns [(source, line, url)] for every broken link, logging each
+        index = output_index(pages, assets, dest_dir, extra)
+        broken = []
+        checked = 0
+        for dest_path in sorted(pages):
+            entry = pages[dest_path]
+            for url, line in entry.get("links") or ():
+                checked += 1
+                target = link_target(url)
+                if target in index or f"{target}/index.html" in index:
+                    continue
+                broken.append((entry["source"], line, url))
+        level = logging.ERROR if self.fail else logging.WARNING
+        for source, line, url in broken:
+            location = source if line is None else f"{source}:{line}"
+            logger.log(
+                level,
+                "%s: broken link %s",
+                location,
+                url,
+                extra=log.fields(
+                    event="broken_link", source=source, line=line, url=url
+                ),
+            )
+        logger.info(
+            "Links: %d checked, %d broken.",
+            checked,
+            len(broken),
+            extra=log.fields(
+                event="links_checked", checked=checked, broken=len(broken)
+            ),
+        )
+        return broken
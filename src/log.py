@@ -0,0 +1,57 @@
+import json
+import logging
+import sys
+
+# Every module logs under "ssg". The library itself never prints: without a
+# handler configured by the application (main() sets one up for the command
+# line), each message costs a level check and nothing else.
+root = logging.getLogger("ssg")
+root.addHandler(logging.NullHandler())
+
+
+def get_logger(name):
+    return root.getChild(name)
+
+
+def fields(**values):
+    # Structured data for a record: logger.info(msg, extra=fields(...)).
+    # The text message stays readable; JsonFormatter emits the fields.
+    return {"fields": values}
+
+
+class TextFormatter(logging.Formatter):
+    # Plain messages, as the command line has always printed them; warnings
+    # and errors say so
+    def format(self, record):
+        message = super().format(record)
+        if record.levelno >= logging.WARNING:
+            return f"{record.levelname.capitalize()}: {message}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line: level, logger, message and the record's fields
+    def format(self, record):
+        entry = {
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure(level=logging.INFO, json_lines=False, stream=None):
+    # Send the generator's log to stream (stdout by default), replacing any
+    # handler set up by an earlier call
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    if json_lines:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter())
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+    return handler
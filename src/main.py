@@ -1,205 +1,621 @@
-from textnode import TextNode, TextType, text_node_to_html_node
-from htmlnode import HTMLNode, LeafNode, ParentNode
-from inline_markdown import *
-
+from builder import write_document
+from compress import compress_outputs
+from manifest import BuildManifest, hash_file
+from output import OutputWriter
+from pipeline import DEFAULT_QUEUE_DEPTH, run_pipeline
+from sitemap import write_feed, write_sitemaps
+from static_sync import sync_static
+from template import load_template
+from watch import watch
+
+import inline_cache
+import links
+import log
+import parse_cache
+import profiling
+import search
+
+import argparse
+import logging
 import os
-import shutil
 import sys
 
-if len(sys.argv) > 1:
-    basepath = sys.argv[1]
-    # Ensure basepath starts and ends with a slash if it's not just "/"
-    if not basepath.startswith("/"):
-        basepath = "/" + basepath
-    if not basepath.endswith("/") and basepath != "/":
-        basepath = basepath + "/"
-else:
-    basepath = "/"  # Default for root deployment
-
-
-def src_to_dst(src, dst):
-    print(f"Copying content from '{src}' to '{dst}'")  # Informative print
-
-    if not os.path.exists(src):
-        raise FileNotFoundError(f"Source directory '{src}' does not exist.")
-    if not os.path.isdir(src):
-        raise NotADirectoryError(f"Source '{src}' is not a directory.")
-
-    # Ensure the destination is a clean, empty directory
-    if os.path.exists(dst):
-        print(f"Destination '{dst}' exists. Removing it to ensure a clean copy.")
-        shutil.rmtree(dst)
-
-    print(f"Creating destination directory '{dst}'.")
-    os.mkdir(dst)  # Use makedirs; it's fine even if only creating one level
-
-    # Get full paths of items in the source directory
-    src_item_names = os.listdir(src)
-    src_item_full_paths = []
-    for name in src_item_names:
-        src_item_full_paths.append(os.path.join(src, name))
-
-    # Initiate the recursive copy
-    recursively_search_directory(src_item_full_paths, src, dst)
-    print("Copy complete.")
-    # No explicit return needed unless specified by requirements for testing
-
-
-# Your recursively_search_directory
-def recursively_search_directory(src_list, src, dst):
-    for file_path in src_list:  # 'file' renamed to 'file_path' for clarity
-        if os.path.isfile(file_path):
-            print(f"copying {file_path} to {dst}")  # Debug print
-            shutil.copy(file_path, dst)  # Copies file into dst directory
-        elif os.path.isdir(file_path):
-            # Calculate corresponding destination directory path
-            # 'file_path' is like /path/to/src/subdir
-            # 'src' is like /path/to/src
-            # 'dst' is like /path/to/dst_root
-            # We want to create /path/to/dst_root/subdir
-            target_subdir_name = os.path.basename(file_path)  # Gets 'subdir'
-            new_dst_dir = os.path.join(
-                dst, target_subdir_name
-            )  # Creates /path/to/dst_root/subdir
-
-            # Your original way using replace also works for this specific structure:
-            # new_dst_dir_alt = file_path.replace(src, dst)
-            # This is fine as long as 'src' is a unique prefix.
-
-            print(f"creating directory {new_dst_dir}")  # Debug print
-            os.makedirs(new_dst_dir)  # Create the destination subdirectory
-
-            # Get items inside the current source subdirectory
-            subdir_item_names = os.listdir(file_path)
-            subdir_item_full_paths = []
-            for name in subdir_item_names:
-                subdir_item_full_paths.append(os.path.join(file_path, name))
-
-            print(f"recursively searching through {new_dst_dir} now")  # Debug print
-            # Recursive call:
-            # src_list: items in current source subdir
-            # src: current source subdir path (file_path)
-            # dst: new destination subdir path (new_dst_dir)
-            recursively_search_directory(subdir_item_full_paths, file_path, new_dst_dir)
-        else:
-            # This case is for items that are neither a file nor a directory
-            # (e.g., broken symlinks, special files).
-            # Raising an error might be too strict; often, these are just skipped.
-            print(
-                f"Warning: Item '{file_path}' is neither a file nor a directory. Skipping."
-            )
-            # raise ValueError(f'Item {file_path} is not a file or directory.')
-    # return os.listdir(dst) # This returns contents of the *current* dst dir being processed.
-    # Not typically useful in a recursive copy.
+logger = log.get_logger("build")
+
+# Build state kept between runs so unchanged pages are not re-rendered
+MANIFEST_PATH = ".build_manifest.json"
+
+CONTENT_DIR = "content"
+STATIC_DIR = "static"
+TEMPLATE_PATH = "template.html"
+DEST_DIR = "docs"
+
+
+def read_source(from_path, dest_path=None):
+    with profiling.stage("file read", dest_path):
+        with open(from_path, "r") as f:
+            return f.read()
 
 
-def extract_title(markdown):
-    with open(markdown, "r") as file:
-        for line in file:
-            line = line.strip()
-            if line.startswith("# "):
-                return line[2:]  # Slice the string after "# "
-    raise ValueError("no h1 header")
+def render_output(markdown, template, dest_path, collect=()):
+    # Streams the page into a temporary file next to dest_path, hashing it
+    # on the way, so a page is never held in memory whole. Returns the open
+    # OutputWriter and the page_info.
+    output = OutputWriter(dest_path)
+    try:
+        info = write_document(markdown, template, output, collect)
+    except BaseException:
+        output.discard()
+        raise
+    return output, info
+
+
+def finish_output(dest_path, output):
+    # Moves the page into place, unless the file there already holds exactly
+    # the same content. Returns (written, output hash).
+    with profiling.stage("write", dest_path):
+        output.close()
+    return output.written, output.hash
+
+
+def write_page(from_path, template, dest_path, collect=()):
+    # Does the actual work of generate_page without any logging, so it can
+    # run inside worker processes without interleaving their output.
+    # Returns (written, output hash, page_info).
+    with profiling.page(dest_path):
+        markdown = read_source(from_path, dest_path)
+        output, info = render_output(markdown, template, dest_path, collect)
+        written, output_hash = finish_output(dest_path, output)
+        return written, output_hash, info
 
 
 def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    print(f"converting {from_path} to list")
-    with open(from_path, "r") as f:
-        markdown = f.read()
-    print(f"converting {template_path} to list")
-    with open(template_path, "r") as f:
-        template = f.read()
-
-    node = markdown_to_html_node(markdown)
-    html = node.to_html()
-    title = extract_title(from_path)
-
-    # Assuming template_content is the full template string
-    final_html_content = template.replace("{{ Title }}", title)
-    final_html_content = final_html_content.replace("{{ Content }}", html)
-    final_html_content = final_html_content.replace('href="/', f'href="{basepath}')
-    final_html_content = final_html_content.replace('src="/', f'src="{basepath}')
-
-    html_filename = os.path.basename(dest_path)
-    directory_path = os.path.dirname(dest_path)
-    if directory_path and not os.path.exists(directory_path):
-        os.makedirs(directory_path)
-    with open(dest_path, "w") as fp:
-        fp.write(final_html_content)
-
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    print(f"Processing directory: {dir_path_content}")  # Helpful for debugging
-    src_dir_list = os.listdir(dir_path_content)
-    for item_name in src_dir_list:  # Changed 'src_path' to 'item_name' for clarity
+    logger.info(
+        "Generating page from %s to %s using %s", from_path, dest_path, template_path
+    )
+    template = load_template(template_path, basepath)
+    write_page(from_path, template, dest_path)
+
+
+def collect_pages(dir_path_content, dest_dir_path):
+    # Walk the content tree and return every (source, destination) pair.
+    # Entries are sorted so the page list (and the log) is the same on every
+    # machine, whatever order the filesystem returns them in.
+    logger.debug("Processing directory: %s", dir_path_content)
+    pages = []
+    for item_name in sorted(os.listdir(dir_path_content)):
         full_src_path = os.path.join(dir_path_content, item_name)
 
         if os.path.isdir(full_src_path):
             # This is a subdirectory in the content folder
-            print(f"Found subdirectory: {item_name}")
-
-            # Path for the source subdirectory (this is full_src_path)
-            # src_subdir_to_recurse = full_src_path # No need for src_path_joined
+            logger.debug("Found subdirectory: %s", item_name)
 
-            # Path for the corresponding destination subdirectory
-            dest_subdir_for_recursion = os.path.join(dest_dir_path, item_name)
+            # Create the destination subdirectory up front so pages (or
+            # worker processes) can write into it straight away
+            dest_subdir = os.path.join(dest_dir_path, item_name)
+            logger.debug("Ensuring destination subdirectory exists: %s", dest_subdir)
+            os.makedirs(dest_subdir, exist_ok=True)
 
-            # CRITICAL: Create the destination subdirectory if it doesn't exist
-            # This needs to happen *before* you try to put files in it or recurse into it
-            print(
-                f"Ensuring destination subdirectory exists: {dest_subdir_for_recursion}"
-            )
-            os.makedirs(dest_subdir_for_recursion, exist_ok=True)
-
-            # Recursive call
-            generate_pages_recursive(
-                full_src_path, template_path, dest_subdir_for_recursion, basepath
-            )
+            pages.extend(collect_pages(full_src_path, dest_subdir))
 
         elif os.path.isfile(full_src_path):
-            # This is a file in the content folder
-            print(f"Found file: {item_name}")
-
-            # BUG 1 & 2 & 3: The logic below is incorrect.
-            # It ignores the actual file found (full_src_path / item_name)
-            # and always tries to process "index.md".
-            # It also doesn't check if the file is a Markdown file.
-
-            # --- CORRECTED FILE HANDLING LOGIC ---
             if item_name.endswith(".md"):  # Process only Markdown files
                 # Determine the output HTML filename (change .md to .html)
                 base_name_without_ext, _ = os.path.splitext(item_name)
-                output_html_filename = base_name_without_ext + ".html"
-
-                # Construct the full destination path for the HTML file
-                # It should go into the current dest_dir_path
-                full_dest_html_path = os.path.join(dest_dir_path, output_html_filename)
-
-                print(f"Generating page for Markdown file: {full_src_path}")
-                print(f"  Output HTML will be: {full_dest_html_path}")
-
-                # Call your existing generate_page function
-                # generate_page(source_markdown_path, template_file_path, destination_html_path)
-                generate_page(
-                    full_src_path, template_path, full_dest_html_path, basepath
+                full_dest_html_path = os.path.join(
+                    dest_dir_path, base_name_without_ext + ".html"
                 )
+                logger.debug("Found file: %s", item_name)
+                pages.append((full_src_path, full_dest_html_path))
             else:
-                print(f"Skipping non-Markdown file: {item_name}")
-                # Optionally, you could copy other static files here if needed,
-                # but the lesson usually separates static asset copying.
-            # --- END OF CORRECTED FILE HANDLING LOGIC ---
+                logger.debug("Skipping non-Markdown file: %s", item_name)
 
         else:
             # This handles cases like broken symlinks or other special file types
-            print(
-                f"Warning: Item '{item_name}' in '{dir_path_content}' is neither a file nor a directory. Skipping."
+            logger.warning(
+                "Item '%s' in '%s' is neither a file nor a directory. Skipping.",
+                item_name,
+                dir_path_content,
             )
+    return pages
+
+
+# Per-process state for --jobs workers, filled in once by _init_worker so the
+# compiled template is not shipped to the worker for every page
+_worker_template = None
+_worker_collect = ()
+
+
+def _init_worker(template, profile, cache_size=0, parse_cache_args=None, collect=()):
+    global _worker_template, _worker_collect
+    _worker_template = template
+    _worker_collect = collect
+    if profile:
+        profiling.enable()
+    if cache_size:
+        inline_cache.enable(cache_size)
+    if parse_cache_args is not None:
+        parse_cache.enable(*parse_cache_args)
+
+
+def _render_in_worker(from_path, dest_path):
+    written, output_hash, info = write_page(
+        from_path, _worker_template, dest_path, _worker_collect
+    )
+    # Timings and cache counts recorded in the worker travel back with the
+    # result
+    events = []
+    if profiling.active is not None:
+        events = profiling.active.take_events()
+    cache_stats = None
+    if inline_cache.active is not None:
+        cache_stats = inline_cache.active.take_stats() + (os.getpid(),)
+    parse_stats = None
+    if parse_cache.active is not None:
+        parse_stats = parse_cache.active.take_stats()
+    return written, output_hash, info, events, cache_stats, parse_stats
+
+
+def build_pages(
+    pages,
+    template_path,
+    basepath,
+    manifest=None,
+    jobs=1,
+    queue_depth=DEFAULT_QUEUE_DEPTH,
+    search_index=None,
+    link_checker=None,
+):
+    # search_index, a search.SearchIndex, is updated with every page
+    # rendered; with a link_checker (links.LinkChecker) every page records
+    # its links for it
+    template = load_template(template_path, basepath)
+
+    # Only re-render when one of the page's inputs (its source and the
+    # template), the basepath or the output on disk differ from the last
+    # recorded build
+    stale = []
+    page_inputs = {}
+    page_reasons = {}
+    source_stats = {}
+    template_hash = hash_file(template_path) if manifest is not None else None
+    for from_path, dest_path in pages:
+        if manifest is not None:
+            source_st = os.stat(from_path)
+            inputs = {
+                from_path: manifest.source_hash(from_path, dest_path, source_st),
+                template_path: template_hash,
+            }
+            reasons = manifest.stale_reasons(from_path, dest_path, inputs, basepath)
+            if not reasons and search_index is not None:
+                if dest_path not in search_index:
+                    reasons = ["page was not in the search index"]
+            if not reasons and link_checker is not None:
+                if manifest.pages[dest_path].get("links") is None:
+                    reasons = ["links were not recorded"]
+            if not reasons:
+                logger.info(
+                    "Up to date, skipping: %s",
+                    dest_path,
+                    extra=log.fields(event="page_fresh", dest=dest_path),
+                )
+                continue
+            page_inputs[dest_path] = inputs
+            page_reasons[dest_path] = reasons
+            source_stats[dest_path] = source_st
+        stale.append((from_path, dest_path))
+
+    # What the parse should yield besides the page itself
+    collect = ()
+    if search_index is not None:
+        collect += ("terms",)
+    if link_checker is not None:
+        collect += ("links",)
+
+    written_count = 0
+
+    def finish(from_path, dest_path, written, output_hash, info):
+        nonlocal written_count
+        if written:
+            written_count += 1
+            logger.info(
+                "Generated page from %s to %s",
+                from_path,
+                dest_path,
+                extra=log.fields(
+                    event="page_written", source=from_path, dest=dest_path
+                ),
+            )
+        else:
+            logger.info(
+                "Unchanged, not rewritten: %s",
+                dest_path,
+                extra=log.fields(
+                    event="page_unchanged", source=from_path, dest=dest_path
+                ),
+            )
+        if manifest is not None:
+            manifest.record(
+                from_path,
+                dest_path,
+                page_inputs[dest_path],
+                basepath,
+                page_reasons[dest_path],
+                output_hash,
+                info,
+                source_stats[dest_path],
+            )
+        if search_index is not None:
+            search_index.update(dest_path, info["title"], info["terms"])
+
+    if jobs > 1 and len(stale) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        parse_cache_args = None
+        if parse_cache.active is not None:
+            cache = parse_cache.active
+            parse_cache_args = (cache.directory, cache.max_bytes, cache.version)
+
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(stale)),
+            initializer=_init_worker,
+            initargs=(
+                template,
+                profiling.active is not None,
+                inline_cache.active.maxsize if inline_cache.active else 0,
+                parse_cache_args,
+                collect,
+            ),
+        ) as pool:
+            # Largest sources first so one big page does not end up running
+            # alone at the tail of the build
+            futures = {}
+            for from_path, dest_path in sorted(
+                stale, key=lambda page: (-os.path.getsize(page[0]), page[0])
+            ):
+                futures[dest_path] = pool.submit(
+                    _render_in_worker, from_path, dest_path
+                )
+            # Collect in page order so logs and the manifest are identical
+            # whatever the number of workers
+            for from_path, dest_path in stale:
+                result = futures[dest_path].result()
+                written, output_hash, info, events, cache_stats, parse_stats = result
+                if profiling.active is not None:
+                    profiling.active.merge(events)
+                if cache_stats is not None:
+                    inline_cache.active.add_stats(*cache_stats)
+                if parse_stats is not None:
+                    parse_cache.active.add_stats(*parse_stats)
+                finish(from_path, dest_path, written, output_hash, info)
+    else:
+        # Filled in by render on this thread, read back when the page's
+        # write finishes
+        infos = {}
+
+        def render(markdown, dest_path):
+            with profiling.page(dest_path):
+                output, infos[dest_path] = render_output(
+                    markdown, template, dest_path, collect
+                )
+            return output
+
+        # Sources are read ahead of the renderer, and each page is compared
+        # with the file on disk and moved into place behind it
+        for from_path, dest_path, (written, output_hash) in run_pipeline(
+            stale, read_source, render, finish_output, queue_depth
+        ):
+            finish(from_path, dest_path, written, output_hash, infos.pop(dest_path))
+
+    logger.info(
+        "Pages: %d written, %d skipped.",
+        written_count,
+        len(pages) - written_count,
+        extra=log.fields(
+            event="pages_built",
+            written=written_count,
+            skipped=len(pages) - written_count,
+        ),
+    )
+    return stale
+
+
+def dest_path_for(from_path, dir_path_content, dest_dir_path):
+    # Same mapping collect_pages uses: content/a/b.md -> docs/a/b.html
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    return os.path.join(dest_dir_path, os.path.splitext(rel_path)[0] + ".html")
+
+
+def is_under(path, root):
+    return path == root or path.startswith(root + os.sep)
+
+
+def rebuild_changed(
+    changed,
+    pages,
+    basepath,
+    manifest,
+    jobs=1,
+    checksum=False,
+    search_index=None,
+    link_checker=None,
+):
+    # Incremental rebuild for --watch. pages is the warm source -> destination
+    # inventory from the previous build and is updated in place; only pages
+    # that depend on a changed file in the recorded dependency graph (and
+    # new pages) are passed on to build_pages, which still skips any whose
+    # inputs hash the same.
+    changed = {os.path.normpath(path) for path in changed}
+    manifest.build += 1
+    content_root = os.path.normpath(CONTENT_DIR)
+
+    if any(is_under(path, os.path.normpath(STATIC_DIR)) for path in changed):
+        sync_static(STATIC_DIR, DEST_DIR, manifest, checksum=checksum)
+
+    content_changes = [path for path in changed if is_under(path, content_root)]
+    if any(
+        not path.endswith(".md") and not os.path.isfile(path)
+        for path in content_changes
+    ):
+        # A directory was added, removed or renamed: walk the tree again
+        current = dict(collect_pages(CONTENT_DIR, DEST_DIR))
+    else:
+        current = dict(pages)
+        for path in content_changes:
+            if not path.endswith(".md"):
+                continue
+            if os.path.isfile(path):
+                current[path] = dest_path_for(path, CONTENT_DIR, DEST_DIR)
+            else:
+                current.pop(path, None)
+
+    for from_path in sorted(set(pages) - set(current)):
+        manifest.forget(pages[from_path], DEST_DIR)
+        logger.info(
+            "Removed stale page: %s",
+            pages[from_path],
+            extra=log.fields(event="page_removed", dest=pages[from_path]),
+        )
+
+    if all(os.path.isdir(path) for path in changed):
+        # Only directories were reported (the inotify queue overflowed and
+        # the events naming the files were lost): any page or the template
+        # may have changed, so check them all against their recorded hashes
+        todo = sorted(current.items())
+    else:
+        affected = set()
+        for path in changed:
+            affected.update(manifest.dependents(path))
+        todo = sorted(
+            (from_path, dest_path)
+            for from_path, dest_path in current.items()
+            if dest_path in affected
+            or dest_path not in manifest.pages
+            or os.path.normpath(from_path) in changed
+        )
+    pages.clear()
+    pages.update(current)
+    if todo:
+        build_pages(
+            todo,
+            TEMPLATE_PATH,
+            basepath,
+            manifest,
+            jobs,
+            search_index=search_index,
+            link_checker=link_checker,
+        )
+    manifest.save()
+
+
+def write_site_indexes(manifest, site_url, basepath):
+    # sitemap.xml and the blog feed, from the titles and dates recorded in
+    # the manifest while pages rendered: nothing is parsed again. Returns
+    # the files written.
+    files = write_sitemaps(manifest.pages, DEST_DIR, site_url, basepath)
+    feed_path = write_feed(manifest.pages, DEST_DIR, site_url, basepath)
+    if feed_path is not None:
+        files.append(feed_path)
+    return files
+
+
+def update_search_index(search_index, manifest):
+    # Pages rendered by this build were indexed as they finished; drop the
+    # removed ones, write the shards that changed and remember the state
+    search_index.sync(manifest.pages)
+    search_index.write()
+    search_index.save(manifest.build)
+
+
+def resolve_output(manifest, target):
+    # --why-rebuilt accepts an output path, a source path or a URL path
+    target = os.path.normpath(target)
+    for dest_path, entry in manifest.pages.items():
+        if os.path.normpath(entry["source"]) == target:
+            return dest_path
+    site_path = os.path.join(DEST_DIR, target.lstrip("/"))
+    candidates = [target, site_path, os.path.join(site_path, "index.html")]
+    for candidate in candidates:
+        candidate = os.path.normpath(candidate)
+        if candidate in manifest.pages:
+            return candidate
+        if os.path.relpath(candidate, DEST_DIR) in manifest.assets:
+            return candidate
+    return target
+
+
+def why_rebuilt(target):
+    manifest = BuildManifest.load(MANIFEST_PATH)
+    if manifest.reset_reason is not None:
+        print(f"Every page will be rebuilt: {manifest.reset_reason}.")
+        return
+    dest_path = resolve_output(manifest, target)
+    for line in manifest.why_rebuilt(dest_path, STATIC_DIR, DEST_DIR):
+        print(line)
+
+
+def normalize_basepath(basepath):
+    # Ensure basepath starts and ends with a slash if it's not just "/"
+    if not basepath.startswith("/"):
+        basepath = "/" + basepath
+    if not basepath.endswith("/") and basepath != "/":
+        basepath = basepath + "/"
+    return basepath
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Build the static site from content/ and static/ into docs/."
+    )
+    parser.add_argument(
+        "basepath",
+        nargs="?",
+        default="/",  # Default for root deployment
+        help="URL prefix the site is served under, e.g. /my-repo/",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes rendering pages (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running; rebuild what changes in content/, static/ or the template",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="with --watch, poll for changes instead of using inotify",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-trace.json",
+        metavar="TRACE_PATH",
+        help="time every build stage per page, print a summary and write a "
+        "Chrome trace (default: build-trace.json)",
+    )
+    parser.add_argument(
+        "--inline-cache",
+        nargs="?",
+        type=int,
+        const=inline_cache.DEFAULT_SIZE,
+        default=0,
+        metavar="SIZE",
+        help="reuse the parse of inline text seen before, keeping up to SIZE "
+        f"distinct texts (default: {inline_cache.DEFAULT_SIZE})",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        nargs="?",
+        const=parse_cache.DEFAULT_DIR,
+        metavar="DIR",
+        help="keep parsed pages on disk and reuse them whenever the same "
+        f"Markdown is built again (default: {parse_cache.DEFAULT_DIR})",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=parse_cache.DEFAULT_SIZE_MB,
+        metavar="MB",
+        help="with --parse-cache, evict the least recently used entries "
+        f"beyond this size (default: {parse_cache.DEFAULT_SIZE_MB})",
+    )
+    parser.add_argument(
+        "--why-rebuilt",
+        metavar="PAGE",
+        help="explain why PAGE (an output, its source or its URL path) was last "
+        "rebuilt and what it depends on, then exit without building",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .zst, where zstd is available) copies "
+        "of every HTML, CSS and text file in docs/ for servers that serve them "
+        "precompressed",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=DEFAULT_QUEUE_DEPTH,
+        metavar="N",
+        help="pages read ahead of rendering and waiting to be written "
+        f"(default: {DEFAULT_QUEUE_DEPTH})",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="origin the site is published at, e.g. https://example.com; "
+        "writes sitemap.xml and an RSS feed of blog/ with absolute URLs",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help=f"write a full-text search index for the browser to "
+        f"docs/{search.OUTPUT_DIR}/, updated incrementally between builds",
+    )
+    parser.add_argument(
+        "--check-links",
+        nargs="?",
+        const="warn",
+        choices=("warn", "error"),
+        help="report root-relative links and images that point at no page or "
+        "static file, with their source line; 'error' also fails the build",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="also log every directory and file found while walking content/",
+    )
+    verbosity.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="only log warnings and errors",
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="log one JSON object per line, with each event's fields, "
+        "instead of plain text",
+    )
+    args = parser.parse_args(argv)
+    args.basepath = normalize_basepath(args.basepath)
+    if args.jobs < 0:
+        parser.error("--jobs must be zero or a positive number")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    if args.inline_cache < 0:
+        parser.error("--inline-cache must be zero or a positive number")
+    if args.queue_depth < 1:
+        parser.error("--queue-depth must be at least 1")
+    if args.parse_cache_size < 0:
+        parser.error("--parse-cache-size must be zero or a positive number")
+    if args.site_url and not args.site_url.startswith(("http://", "https://")):
+        parser.error("--site-url must start with http:// or https://")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.verbose:
+        level = logging.DEBUG
+    elif args.quiet:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    log.configure(level, json_lines=args.log_json)
 
-    # No return value is typically needed for a function that performs actions like this
-
-
-def main():
     #    node = TextNode('This is some anchor text', TextType.LINK, 'https://www.boot.dev')
     #    print(node)
     #    print(node.text_type)
@@ -359,13 +775,133 @@ def main():
     #    print(src_to_dst('static/', 'public/'))
     #    print(generate_page('content/index.md', 'template.html', 'public/index.html'))
 
-    src_to_dst("static/", "docs/")
+    if args.why_rebuilt:
+        why_rebuilt(args.why_rebuilt)
+        return
+
+    if args.profile:
+        profiling.enable()
+    if args.inline_cache:
+        inline_cache.enable(args.inline_cache)
+    if args.parse_cache:
+        parse_cache.enable(args.parse_cache, args.parse_cache_size * 1024 * 1024)
+
+    manifest = BuildManifest.load(MANIFEST_PATH)
+    with profiling.stage("directory walk"):
+        pages = collect_pages(CONTENT_DIR, DEST_DIR)
+    with profiling.stage("static copy"):
+        # Page outputs are kept even when the manifest cannot say which
+        # files in docs/ the last build wrote
+        sync_static(
+            STATIC_DIR,
+            DEST_DIR,
+            manifest,
+            checksum=args.checksum,
+            keep=[os.path.relpath(dest_path, DEST_DIR) for _, dest_path in pages],
+        )
     #    generate_page('content/index.md', 'template.html', 'public/index.html')
     #    generate_page('content/blog/glorfindel/index.md', 'template.html', 'public/blog/glorfindel/index.html')
     #    generate_page('content/blog/tom/index.md', 'template.html', 'public/blog/tom/index.html')
     #    generate_page('content/blog/majesty/index.md', 'template.html', 'public/blog/majesty/index.html')
     #    generate_page('content/contact/index.md', 'template.html', 'public/contact/index.html')
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    link_checker = None
+    if args.check_links:
+        link_checker = links.LinkChecker(fail=args.check_links == "error")
+    search_index = None
+    if args.search_index:
+        search_index = search.SearchIndex.load(DEST_DIR, args.basepath, manifest)
+        if search_index.reset_reason is not None and manifest.pages:
+            logger.info(
+                "Search index rebuilt from scratch: %s.", search_index.reset_reason
+            )
+    build_pages(
+        pages,
+        TEMPLATE_PATH,
+        args.basepath,
+        manifest,
+        args.jobs,
+        args.queue_depth,
+        search_index,
+        link_checker,
+    )
+    for removed in manifest.prune(DEST_DIR):
+        logger.info(
+            "Removed stale page: %s",
+            removed,
+            extra=log.fields(event="page_removed", dest=removed),
+        )
+    manifest.save()
+    if search_index is not None:
+        with profiling.stage("search index"):
+            update_search_index(search_index, manifest)
+    site_indexes = []
+    if args.site_url:
+        with profiling.stage("sitemap"):
+            site_indexes = write_site_indexes(manifest, args.site_url, args.basepath)
+    broken = []
+    if link_checker is not None:
+        with profiling.stage("check links"):
+            broken = link_checker.check(
+                manifest.pages, manifest.assets, DEST_DIR, site_indexes
+            )
+    if args.compress:
+        with profiling.stage("compress"):
+            compress_outputs(DEST_DIR, manifest=manifest)
+        manifest.save()
+
+    if inline_cache.active is not None:
+        logger.info("%s", inline_cache.active.summary())
+    if parse_cache.active is not None:
+        logger.info("%s", parse_cache.active.summary())
+        evicted = parse_cache.active.evict()
+        if evicted:
+            logger.info(
+                "Parse cache: evicted %d least recently used entries", evicted
+            )
+    if profiling.active is not None:
+        logger.info("%s", profiling.active.summary())
+        profiling.active.export_chrome_trace(args.profile)
+        logger.info("Trace written to %s", args.profile)
+    if broken and link_checker.fail and not args.watch:
+        logger.error("Build failed: %d broken links.", len(broken))
+        sys.exit(1)
+
+    if args.watch:
+        # Everything loaded above (manifest, compiled template, page
+        # inventory) stays in memory between rebuilds
+        inventory = dict(pages)
+
+        def on_change(changed):
+            rebuild_changed(
+                changed,
+                inventory,
+                args.basepath,
+                manifest,
+                args.jobs,
+                args.checksum,
+                search_index,
+                link_checker,
+            )
+            if search_index is not None:
+                update_search_index(search_index, manifest)
+            site_indexes = []
+            if args.site_url:
+                site_indexes = write_site_indexes(
+                    manifest, args.site_url, args.basepath
+                )
+            if link_checker is not None:
+                link_checker.check(
+                    manifest.pages, manifest.assets, DEST_DIR, site_indexes
+                )
+            if args.compress:
+                compress_outputs(DEST_DIR, manifest=manifest)
+                manifest.save()
+
+        watch(
+            [CONTENT_DIR, STATIC_DIR, TEMPLATE_PATH],
+            on_change,
+            use_inotify=not args.poll,
+        )
 
 
 if __name__ == "__main__":
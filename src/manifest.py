@@ -0,0 +1,288 @@
+import glob
+import hashlib
+import json
+import os
+
+import log
+
+logger = log.get_logger("manifest")
+
+# Bump this when the layout of the manifest file itself changes
+MANIFEST_VERSION = 3
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint():
+    # Any change to the generator's own source can change every page, so the
+    # non-test modules next to this file are part of every page's inputs.
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(src_dir, "*.py"))):
+        name = os.path.basename(path)
+        if name.startswith("test_"):
+            continue
+        digest.update(name.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def remove_empty_dirs(path, root):
+    # Drop the directories removing path left empty, up to (not including)
+    # root
+    parent = os.path.dirname(path)
+    while (
+        os.path.abspath(parent) != os.path.abspath(root)
+        and os.path.isdir(parent)
+        and not os.listdir(parent)
+    ):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+class BuildManifest:
+    def __init__(self, path, fingerprint=None):
+        self.path = path
+        self.fingerprint = fingerprint or code_fingerprint()
+        # The dependency graph of the last build. Every output records the
+        # inputs it was built from, so a changed input invalidates exactly
+        # the pages that depend on it:
+        # dest_path -> {"source", "source_size", "source_mtime_ns",
+        #               "inputs": {input_path: hash}, "basepath",
+        #               "output_hash", "output_size", "output_mtime_ns",
+        #               "built", "reasons"}
+        self.pages = {}
+        # Static files synced into the output directory on the last build:
+        # rel_path -> {"size", "mtime_ns", optional "hash", "built", "reasons"}
+        self.assets = {}
+        # Text outputs that --compress found no smaller when compressed:
+        # rel_path -> [size, mtime_ns, [suffixes]], so the next build does
+        # not compress them again unless they change
+        self.incompressible = {}
+        self.seen = set()
+        # Numbered so why_rebuilt() can tell how long ago an output was built
+        self.build = 1
+        # Why every output was invalidated, when the old manifest was thrown away
+        self.reset_reason = "no previous build"
+        # Outputs listed by a manifest that could not be trusted: their
+        # records are gone, but they are still removed if this build does
+        # not produce them again
+        self.stale_pages = set()
+        self.stale_assets = set()
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        manifest = cls(path, fingerprint)
+        if not os.path.exists(path):
+            return manifest
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(
+                "could not read build manifest '%s'. Rebuilding.",
+                path,
+                extra=log.fields(event="manifest_unreadable", path=path),
+            )
+            manifest.reset_reason = "build manifest was unreadable"
+            return manifest
+        # A different manifest layout or a different generator means nothing
+        # recorded in the old file can be trusted
+        reset_reason = None
+        if data.get("version") != MANIFEST_VERSION:
+            reset_reason = "build manifest format changed"
+        elif data.get("fingerprint") != manifest.fingerprint:
+            reset_reason = "generator code changed"
+        if reset_reason is not None:
+            manifest.reset_reason = reset_reason
+            manifest.stale_pages = set(data.get("pages") or ())
+            manifest.stale_assets = set(data.get("assets") or ())
+            return manifest
+        manifest.pages = data.get("pages", {})
+        manifest.assets = data.get("assets", {})
+        manifest.incompressible = data.get("incompressible", {})
+        manifest.build = data.get("build", 0) + 1
+        manifest.reset_reason = None
+        return manifest
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "pages": self.pages,
+            "assets": self.assets,
+            "incompressible": self.incompressible,
+            "build": self.build,
+        }
+        # Write to a temporary file first so an interrupted build never
+        # leaves a truncated manifest behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def source_hash(self, from_path, dest_path, st=None):
+        # Reuse the recorded hash when the file's size and mtime are unchanged,
+        # so an unchanged tree costs one stat() per page instead of a full read.
+        # st is the stat taken before hashing; record() must store that same
+        # one, so a save after it shows up as a changed mtime next build.
+        if st is None:
+            st = os.stat(from_path)
+        entry = self.pages.get(dest_path)
+        if (
+            entry is not None
+            and entry.get("source") == from_path
+            and entry.get("source_size") == st.st_size
+            and entry.get("source_mtime_ns") == st.st_mtime_ns
+        ):
+            return entry["inputs"][from_path]
+        return hash_file(from_path)
+
+    def output_matches(self, entry, dest_path):
+        try:
+            st = os.stat(dest_path)
+        except FileNotFoundError:
+            return False
+        if (
+            entry.get("output_size") == st.st_size
+            and entry.get("output_mtime_ns") == st.st_mtime_ns
+        ):
+            return True
+        # Touched or edited by hand: only the content decides
+        return hash_file(dest_path) == entry.get("output_hash")
+
+    def stale_reasons(self, from_path, dest_path, inputs, basepath):
+        # Why dest_path has to be rebuilt from inputs ({path: hash}); an
+        # empty list means it is up to date
+        self.seen.add(dest_path)
+        entry = self.pages.get(dest_path)
+        if entry is None:
+            return [self.reset_reason or "new page"]
+        reasons = []
+        old_inputs = entry.get("inputs", {})
+        for path, digest in sorted(inputs.items()):
+            if path not in old_inputs:
+                reasons.append(f"new dependency {path}")
+            elif old_inputs[path] != digest:
+                reasons.append(f"{path} changed")
+        for path in sorted(set(old_inputs) - set(inputs)):
+            reasons.append(f"no longer depends on {path}")
+        if entry.get("basepath") != basepath:
+            reasons.append(
+                f"basepath changed from {entry.get('basepath')} to {basepath}"
+            )
+        if not reasons and not self.output_matches(entry, dest_path):
+            if os.path.exists(dest_path):
+                reasons.append("output was modified outside the build")
+            else:
+                reasons.append("output was missing")
+        return reasons
+
+    def record(
+        self,
+        from_path,
+        dest_path,
+        inputs,
+        basepath,
+        reasons=None,
+        output_hash=None,
+        info=None,
+        source_st=None,
+    ):
+        self.seen.add(dest_path)
+        if source_st is None:
+            source_st = os.stat(from_path)
+        output_st = os.stat(dest_path)
+        if output_hash is None:
+            output_hash = hash_file(dest_path)
+        self.pages[dest_path] = {
+            "source": from_path,
+            "source_size": source_st.st_size,
+            "source_mtime_ns": source_st.st_mtime_ns,
+            "inputs": dict(inputs),
+            "basepath": basepath,
+            "output_hash": output_hash,
+            "output_size": output_st.st_size,
+            "output_mtime_ns": output_st.st_mtime_ns,
+            "built": self.build,
+            "reasons": list(reasons or []),
+            # Title and front matter date, for the sitemap and feed
+            "title": (info or {}).get("title"),
+            "date": (info or {}).get("date"),
+        }
+        if info and "links" in info:
+            # [url, line] of every root-relative link, for check-links
+            self.pages[dest_path]["links"] = info["links"]
+
+    def dependents(self, input_path):
+        # Outputs recorded as built from input_path
+        input_path = os.path.normpath(input_path)
+        return sorted(
+            dest_path
+            for dest_path, entry in self.pages.items()
+            if any(os.path.normpath(path) == input_path for path in entry["inputs"])
+        )
+
+    def forget(self, dest_path, dest_dir=None):
+        # The source of dest_path is gone: drop its record and its output,
+        # and the directories under dest_dir that held nothing else
+        self.pages.pop(dest_path, None)
+        self.seen.discard(dest_path)
+        self.stale_pages.discard(dest_path)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            if dest_dir is not None:
+                remove_empty_dirs(dest_path, dest_dir)
+
+    def prune(self, dest_dir=None):
+        # Pages whose source disappeared since the last build, including
+        # those of a manifest that was thrown away: forget them and remove
+        # the stale output so it is not published any more
+        removed = []
+        for dest_path in sorted((set(self.pages) | self.stale_pages) - self.seen):
+            self.forget(dest_path, dest_dir)
+            removed.append(dest_path)
+        return removed
+
+    def why_rebuilt(self, dest_path, static_dir=None, dest_dir=None):
+        # Lines explaining when and why dest_path was last written, and what
+        # it depends on. Static files are looked up under dest_dir.
+        entry = self.pages.get(dest_path)
+        inputs = entry.get("inputs", {}) if entry else {}
+        if entry is None and dest_dir is not None:
+            rel_path = os.path.relpath(dest_path, dest_dir)
+            entry = self.assets.get(rel_path)
+            if entry is not None and static_dir is not None:
+                inputs = {os.path.join(static_dir, rel_path): entry.get("hash")}
+        if entry is None:
+            return [f"{dest_path} is not an output of the last build."]
+
+        built = entry.get("built")
+        ago = self.build - 1 - built if built is not None else None
+        if ago is None:
+            lines = [f"{dest_path} has not been rebuilt since it was first recorded."]
+        elif ago == 0:
+            lines = [f"{dest_path} was rebuilt in the last build (#{built}):"]
+        else:
+            lines = [
+                f"{dest_path} was last rebuilt in build #{built}, "
+                f"{ago} build(s) ago, and has been up to date since:"
+            ]
+        lines += [f"  - {reason}" for reason in entry.get("reasons", [])]
+        lines.append("Depends on:")
+        for path, digest in sorted(inputs.items()):
+            lines.append(f"  {path}" + (f" (sha256 {digest[:12]})" if digest else ""))
+        if "basepath" in entry:
+            lines.append(f"  basepath {entry['basepath']}")
+        return lines
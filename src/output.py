@@ -0,0 +1,129 @@
+import hashlib
+import os
+
+from manifest import hash_bytes, hash_file
+
+
+# Precompressed copies compress.py may have left next to an output
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def remove_compressed(path):
+    # A rewritten output's precompressed copies describe the old content;
+    # a build without --compress must not leave them to be served
+    for suffix in COMPRESSED_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def write_if_changed(path, data):
+    # Write data (bytes) to path unless the file already holds exactly that
+    # content, so unchanged outputs keep their mtime and deploys and CDN
+    # purges only see real changes. Returns (written, sha256 of data).
+    digest = hash_bytes(data)
+    try:
+        if os.path.getsize(path) == len(data) and hash_file(path) == digest:
+            return False, digest
+    except FileNotFoundError:
+        pass
+
+    directory_path = os.path.dirname(path)
+    if directory_path:
+        os.makedirs(directory_path, exist_ok=True)
+    # Write to a temporary name so a failed write never leaves a
+    # half-written file behind
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    remove_compressed(path)
+    return True, digest
+
+
+# OutputWriter encodes and writes text in batches of about this many
+# characters rather than one small chunk (a tag, a text node) at a time
+BUFFER_CHARS = 1 << 16
+
+
+class OutputWriter:
+    # write_if_changed for outputs produced piece by piece (pages, sitemaps,
+    # feeds), so they never have to be held in memory whole. Text goes to a
+    # temporary file and is hashed on the way; close() moves it into place
+    # only if it differs from the file already there. Use as a context
+    # manager; written and hash (sha256 of the content) are set once it is
+    # closed.
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.digest = hashlib.sha256()
+        self.written_size = 0
+        self.pending = []
+        self.pending_chars = 0
+        self.written = None
+        self.hash = None
+        directory_path = os.path.dirname(path)
+        if directory_path:
+            os.makedirs(directory_path, exist_ok=True)
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_chars += len(text)
+        if self.pending_chars >= BUFFER_CHARS:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            data = "".join(self.pending).encode("utf-8")
+            self.pending = []
+            self.pending_chars = 0
+            self.digest.update(data)
+            self.written_size += len(data)
+            self.file.write(data)
+
+    @property
+    def size(self):
+        # Bytes of content so far
+        self.flush()
+        return self.written_size
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.hash = self.digest.hexdigest()
+        try:
+            unchanged = (
+                os.path.getsize(self.path) == self.written_size
+                and hash_file(self.path) == self.hash
+            )
+        except FileNotFoundError:
+            unchanged = False
+        if unchanged:
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, self.path)
+            remove_compressed(self.path)
+        self.written = not unchanged
+        return self.written
+
+    def discard(self):
+        self.pending = []
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+
+from htmlnode import iter_html
+from inline_markdown import Document, document_text
+from manifest import code_fingerprint
+
+# Bump this when the layout of a cache entry changes
+FORMAT_VERSION = 3
+MAGIC = b"SSGP"
+
+DEFAULT_DIR = ".parse_cache"
+DEFAULT_SIZE_MB = 64
+
+# Temporary files older than this were left by a writer that died
+STALE_TMP_SECONDS = 3600
+
+# Serializing with this as the basepath marks where every root-relative URL
+# starts, so a cached body can be joined back together under any basepath
+URL_MARK = "\0"
+
+_LENGTH = struct.Struct("<I")
+_NONE = 0xFFFFFFFF  # length marking a missing string
+
+# The cache for this process, or None while caching is off. Set by enable();
+# --jobs workers get their own through the pool initializer.
+active = None
+
+
+def _pack_str(parts, text):
+    if text is None:
+        parts.append(_LENGTH.pack(_NONE))
+        return
+    data = text.encode("utf-8")
+    parts.append(_LENGTH.pack(len(data)))
+    parts.append(data)
+
+
+def _unpack_str(data, offset):
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    if length == _NONE:
+        return None, offset
+    end = offset + length
+    if end > len(data):
+        raise ValueError("truncated cache entry")
+    return data[offset:end].decode("utf-8"), end
+
+
+def cacheable(markdown):
+    # Text containing the marker itself would be cut in the wrong places
+    return URL_MARK not in markdown
+
+
+def body_parts(node):
+    # The body HTML, cut just before the "/" of every root-relative URL
+    return "".join(iter_html(node, URL_MARK + "/")).split(URL_MARK)
+
+
+def join_body(parts, basepath):
+    return basepath[:-1].join(parts)
+
+
+def pack_entry(document, parts):
+    # Length-prefixed UTF-8 fields, compressed: title, first heading level
+    # and text, front matter pairs, the body's plain text (for the search
+    # index), then the pieces of the body HTML
+    fields = [bytes([FORMAT_VERSION])]
+    _pack_str(fields, document.title)
+    level, text = document.first_heading or (0, None)
+    fields.append(bytes([level]))
+    _pack_str(fields, text)
+    fields.append(_LENGTH.pack(len(document.metadata)))
+    for key, value in document.metadata.items():
+        _pack_str(fields, key)
+        _pack_str(fields, value)
+    _pack_str(fields, document_text(document))
+    fields.append(_LENGTH.pack(len(parts)))
+    for part in parts:
+        _pack_str(fields, part)
+    return MAGIC + zlib.compress(b"".join(fields), 1)
+
+
+def unpack_entry(blob):
+    if not blob.startswith(MAGIC):
+        raise ValueError("not a parse cache entry")
+    data = zlib.decompress(blob[len(MAGIC) :])
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError("unknown cache entry version")
+    title, offset = _unpack_str(data, 1)
+    level = data[offset]
+    heading_text, offset = _unpack_str(data, offset + 1)
+    (count,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    metadata = {}
+    for _ in range(count):
+        key, offset = _unpack_str(data, offset)
+        metadata[key], offset = _unpack_str(data, offset)
+    text, offset = _unpack_str(data, offset)
+    (count,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    parts = []
+    for _ in range(count):
+        part, offset = _unpack_str(data, offset)
+        parts.append(part)
+    if offset != len(data):
+        raise ValueError("trailing data in cache entry")
+    first_heading = (level, heading_text) if level else None
+    return Document(None, title, first_heading, metadata, text), parts
+
+
+class ParseCache:
+    # Parsed pages on disk, one file per Markdown source, named by the hash
+    # of the source text and the parser version. The body HTML is stored cut
+    # at its root-relative URLs (see body_parts), so entries are shared
+    # between basepaths and templates. Entries are written to a temporary
+    # file and renamed into place, so parallel workers and concurrent builds
+    # only ever see complete files; a hit refreshes the entry's mtime, which
+    # evict() uses as its least-recently-used order.
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=None, version=None):
+        self.directory = directory
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else DEFAULT_SIZE_MB * 1024 * 1024
+        )
+        self.version = version or code_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, markdown):
+        digest = hashlib.sha256()
+        digest.update(f"{FORMAT_VERSION}:{self.version}\0".encode())
+        digest.update(markdown.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        # (Document without a node, body parts), or None on a miss
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            self.count(False)
+            return None
+        try:
+            entry = unpack_entry(blob)
+        except (ValueError, IndexError, struct.error, zlib.error):
+            # Damaged entry: drop it and parse again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.count(False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.count(True)
+        return entry
+
+    def put(self, key, document, parts):
+        # A cache that cannot be written only costs speed, never the build
+        path = self.entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(pack_entry(document, parts))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def take_stats(self):
+        with self.lock:
+            stats = (self.hits, self.misses)
+            self.hits = self.misses = 0
+            return stats
+
+    def add_stats(self, hits, misses):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def evict(self):
+        # Delete least recently used entries until the cache fits in
+        # max_bytes. Returns the number of entries removed.
+        entries = []
+        total = 0
+        now = time.time()
+        for dir_path, _, file_names in os.walk(self.directory):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # removed by another build
+                if name.endswith(".tmp"):
+                    if now - st.st_mtime > STALE_TMP_SECONDS:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    continue
+                entries.append((st.st_mtime_ns, path, st.st_size))
+                total += st.st_size
+        removed = 0
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        return (
+            f"Parse cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.1f}% hit rate)"
+        )
+
+
+def enable(directory=DEFAULT_DIR, max_bytes=None, version=None):
+    global active
+    active = ParseCache(directory, max_bytes, version)
+    return active
+
+
+def disable():
+    global active
+    active = None
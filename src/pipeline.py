@@ -0,0 +1,63 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# How many pages may be read ahead of the renderer, and how many rendered
+# pages may wait for the writer, before the stage feeding them blocks
+DEFAULT_QUEUE_DEPTH = 8
+# Concurrent reads; more than one mostly helps on network filesystems
+DEFAULT_READERS = 4
+
+
+def run_pipeline(
+    pages, read, render, write, queue_depth=DEFAULT_QUEUE_DEPTH, readers=None
+):
+    # Overlaps disk and CPU for (from_path, dest_path) pages: a pool of
+    # reader threads prefetches read(from_path, dest_path), the calling
+    # thread runs render(source, dest_path), and a background thread runs
+    # write(dest_path, rendered). Each queue holds at most queue_depth
+    # pages, so a slow stage holds the others back instead of piling up
+    # memory. Yields (from_path, dest_path, write result) in page order.
+    if queue_depth < 1:
+        raise ValueError("queue depth must be at least 1")
+    if readers is None:
+        readers = min(DEFAULT_READERS, queue_depth)
+    pending = iter(pages)
+    reads = deque()
+    writes = deque()
+
+    with ThreadPoolExecutor(readers) as read_pool, ThreadPoolExecutor(1) as write_pool:
+
+        def prefetch():
+            while len(reads) < queue_depth:
+                page = next(pending, None)
+                if page is None:
+                    return
+                reads.append((page, read_pool.submit(read, *page)))
+
+        def finish_oldest():
+            from_path, dest_path, future = writes.popleft()
+            return from_path, dest_path, future.result()
+
+        try:
+            prefetch()
+            while reads:
+                (from_path, dest_path), source = reads.popleft()
+                try:
+                    source = source.result()
+                    prefetch()
+                    rendered = render(source, dest_path)
+                except Exception:
+                    # Hand over the pages written so far before failing
+                    while writes:
+                        yield finish_oldest()
+                    raise
+                future = write_pool.submit(write, dest_path, rendered)
+                writes.append((from_path, dest_path, future))
+                while len(writes) > queue_depth or (writes and writes[0][2].done()):
+                    yield finish_oldest()
+            while writes:
+                yield finish_oldest()
+        finally:
+            # On an error, do not start reads that nobody will render
+            for _, future in reads:
+                future.cancel()
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Stages in build order, used to order the summary
+STAGES = (
+    "static copy",
+    "directory walk",
+    "file read",
+    "parse cache",
+    "block split",
+    "block classify",
+    "inline parse",
+    "tree build",
+    "serialize",
+    "template fill",
+    "search terms",
+    "links",
+    "write",
+    "sitemap",
+    "search index",
+    "check links",
+    "compress",
+)
+
+# Shared no-op context returned while profiling is off, so instrumented code
+# pays for one function call and nothing else
+_NOOP = nullcontext()
+
+# The profiler for this process, or None. Set by enable(); worker processes
+# get their own through the --jobs pool initializer.
+active = None
+
+
+class Profiler:
+    def __init__(self):
+        # (stage, page, start_ns, duration_ns, pid, tid) tuples
+        self.events = []
+        self.start_ns = time.perf_counter_ns()
+        self.local = threading.local()
+
+    @contextmanager
+    def stage(self, name, page=None):
+        page = page if page is not None else getattr(self.local, "page", None)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            self.events.append(
+                (name, page, start, duration, os.getpid(), threading.get_ident())
+            )
+
+    @contextmanager
+    def page(self, page):
+        # Stages recorded inside are attributed to this page
+        self.local.page = page
+        self.local.totals = {}
+        self.local.nested = []
+        try:
+            yield
+        finally:
+            self.local.page = None
+
+    @contextmanager
+    def accumulate(self, name):
+        # For stages that run many times per page (once per block, once per
+        # inline span): sum their exclusive time and record one event per
+        # page from flush_totals(), instead of thousands of tiny ones
+        nested = getattr(self.local, "nested", None)
+        if nested is None:
+            nested = self.local.nested = []
+            self.local.totals = {}
+        nested.append(0)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            children = nested.pop()
+            if nested:
+                nested[-1] += elapsed
+            totals = self.local.totals
+            totals[name] = totals.get(name, 0) + elapsed - children
+
+    def flush_totals(self, start_ns):
+        # Lay the accumulated stages end to end from start_ns, so the trace
+        # shows how a page's parse time divides between them
+        totals = getattr(self.local, "totals", None) or {}
+        offset = start_ns
+        for name in STAGES:
+            if name in totals:
+                self.events.append(
+                    (
+                        name,
+                        getattr(self.local, "page", None),
+                        offset,
+                        totals[name],
+                        os.getpid(),
+                        threading.get_ident(),
+                    )
+                )
+                offset += totals[name]
+        self.local.totals = {}
+
+    def take_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def merge(self, events):
+        self.events.extend(events)
+
+    def chrome_trace(self):
+        # Trace Event Format "complete" events, loadable in chrome://tracing
+        # and Perfetto. Timestamps are microseconds since the build started.
+        trace = []
+        for name, page, start, duration, pid, tid in self.events:
+            event = {
+                "name": name,
+                "cat": "build",
+                "ph": "X",
+                "ts": (start - self.start_ns) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if page is not None:
+                event["args"] = {"page": page}
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self, slowest=10):
+        wall_ns = time.perf_counter_ns() - self.start_ns
+        stage_totals = {}
+        stage_counts = {}
+        page_totals = {}
+        for name, page, _, duration, _, _ in self.events:
+            stage_totals[name] = stage_totals.get(name, 0) + duration
+            stage_counts[name] = stage_counts.get(name, 0) + 1
+            if page is not None:
+                page_totals[page] = page_totals.get(page, 0) + duration
+
+        lines = [f"Build profile ({wall_ns / 1e9:.3f}s wall)"]
+        lines.append(
+            f"  {'stage':16} {'total (ms)':>11} {'calls':>7} {'of wall':>8}"
+        )
+        order = [name for name in STAGES if name in stage_totals]
+        order += sorted(set(stage_totals) - set(STAGES))
+        for name in order:
+            total = stage_totals[name]
+            lines.append(
+                f"  {name:16} {total / 1e6:>11.2f} {stage_counts[name]:>7} "
+                f"{100 * total / wall_ns if wall_ns else 0:>7.1f}%"
+            )
+        if page_totals:
+            lines.append("  Slowest pages:")
+            ranked = sorted(
+                page_totals.items(), key=lambda item: (-item[1], item[0])
+            )
+            for page, total in ranked[:slowest]:
+                lines.append(f"  {total / 1e6:>10.2f} ms  {page}")
+        return "\n".join(lines)
+
+
+def enable():
+    global active
+    active = Profiler()
+    return active
+
+
+def disable():
+    global active
+    active = None
+
+
+def stage(name, page=None):
+    if active is None:
+        return _NOOP
+    return active.stage(name, page)
+
+
+def accumulate(name):
+    if active is None:
+        return _NOOP
+    return active.accumulate(name)
+
+
+def page(name):
+    if active is None:
+        return _NOOP
+    return active.page(name)
@@ -0,0 +1,289 @@
+import heapq
+import json
+import os
+import re
+from collections import Counter
+
+import log
+from output import write_if_changed
+from sitemap import page_url
+
+logger = log.get_logger("search")
+
+# Bump this when the layout of the index files or of the state file changes
+FORMAT_VERSION = 1
+
+# Terms, postings and page ids kept between builds, so a build only has to
+# tokenize the pages it renders
+STATE_PATH = ".search_index.json"
+# Inside the output directory
+OUTPUT_DIR = "search"
+
+# Pages per pages-N.json file: a result list fetches one or two of them
+PAGE_BLOCK = 1000
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Terms are sharded by their first two characters; terms starting with
+# anything other than ASCII letters and digits share one shard
+SAFE_PREFIX = re.compile(r"[a-z0-9]{1,2}")
+OTHER_SHARD = "_"
+
+
+def page_terms(text):
+    # {term: occurrences}: case-folded words of two or more characters
+    terms = Counter(TOKEN_PATTERN.findall(text.casefold()))
+    return {term: count for term, count in terms.items() if len(term) > 1}
+
+
+def shard_name(term):
+    prefix = term[:2]
+    return prefix if SAFE_PREFIX.fullmatch(prefix) else OTHER_SHARD
+
+
+def encode_postings(postings):
+    # {page id: occurrences} -> [gap, count, gap, count, ...] in id order,
+    # each gap the difference from the previous id (the first is the id
+    # itself), so most numbers stay short
+    flat = []
+    previous = 0
+    for page_id in sorted(postings):
+        flat.append(page_id - previous)
+        flat.append(postings[page_id])
+        previous = page_id
+    return flat
+
+
+def decode_postings(flat):
+    postings = {}
+    page_id = 0
+    for i in range(0, len(flat), 2):
+        page_id += flat[i]
+        postings[page_id] = flat[i + 1]
+    return postings
+
+
+def _json_bytes(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
+    )
+
+
+class SearchIndex:
+    # Inverted index of every page's words, written to dest_dir/search/ for
+    # the browser:
+    #   index.json    {"version", "docs", "pages", "block", "shards"}
+    #   <prefix>.json {term: delta-encoded postings (encode_postings)} for
+    #                 the terms starting with prefix (see shard_name)
+    #   pages-N.json  [url, title] (null for a free id) for page ids
+    #                 N*block to N*block + block - 1
+    # Page ids are stable between builds and freed ids are reused, so an
+    # edit only rewrites the shards of the terms it added or removed and
+    # the block holding the page.
+    def __init__(self, dest_dir, basepath="/", path=STATE_PATH, fingerprint=None):
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.path = path
+        self.fingerprint = fingerprint
+        self.docs = {}  # dest_path -> [page id, url, title, {term: count}]
+        self.free_ids = []  # heap of ids of removed pages
+        self.next_id = 0
+        self.by_id = {}  # page id -> dest_path
+        self.postings = {}  # term -> {page id: count}
+        self.shards = {}  # shard name -> set of terms
+        self.dirty_shards = set()
+        self.dirty_blocks = set()
+        # Why the saved state was not used, or None
+        self.reset_reason = "no previous search index"
+
+    @classmethod
+    def load(cls, dest_dir, basepath, manifest, path=STATE_PATH):
+        # The saved state is only trusted if the build that wrote the
+        # manifest wrote it too: a build without the index may have changed
+        # pages behind its back
+        index = cls(dest_dir, basepath, path, manifest.fingerprint)
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            index.reset_reason = "search index state was unreadable"
+            return index
+        if data.get("version") != FORMAT_VERSION:
+            index.reset_reason = "search index format changed"
+            return index
+        if data.get("fingerprint") != manifest.fingerprint:
+            index.reset_reason = "generator code changed"
+            return index
+        if manifest.reset_reason is not None or data.get("build") != manifest.build - 1:
+            index.reset_reason = "pages were built without the search index"
+            return index
+        index.next_id = data["next_id"]
+        index.free_ids = data["free_ids"]
+        heapq.heapify(index.free_ids)
+        for dest_path, (page_id, url, title, terms) in data["docs"].items():
+            index.docs[dest_path] = [page_id, url, title, terms]
+            index.by_id[page_id] = dest_path
+            for term, count in terms.items():
+                index._add_posting(term, page_id, count)
+        index.dirty_shards.clear()
+        index.reset_reason = None
+        return index
+
+    def save(self, build):
+        data = {
+            "version": FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "build": build,
+            "next_id": self.next_id,
+            "free_ids": sorted(self.free_ids),
+            "docs": self.docs,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def __contains__(self, dest_path):
+        return dest_path in self.docs
+
+    def _add_posting(self, term, page_id, count):
+        postings = self.postings.get(term)
+        if postings is None:
+            postings = self.postings[term] = {}
+            self.shards.setdefault(shard_name(term), set()).add(term)
+        postings[page_id] = count
+        self.dirty_shards.add(shard_name(term))
+
+    def _remove_posting(self, term, page_id):
+        postings = self.postings[term]
+        del postings[page_id]
+        name = shard_name(term)
+        if not postings:
+            del self.postings[term]
+            self.shards[name].discard(term)
+            if not self.shards[name]:
+                del self.shards[name]
+        self.dirty_shards.add(name)
+
+    def update(self, dest_path, title, terms):
+        # Index (or re-index) a rendered page
+        url = page_url("", self.basepath, os.path.relpath(dest_path, self.dest_dir))
+        old = self.docs.get(dest_path)
+        if old is None:
+            if self.free_ids:
+                page_id = heapq.heappop(self.free_ids)
+            else:
+                page_id = self.next_id
+                self.next_id += 1
+            old_terms = {}
+        else:
+            page_id, old_url, old_title, old_terms = old
+            if old_url == url and old_title == title and old_terms == terms:
+                return
+        for term in old_terms:
+            if terms.get(term) != old_terms[term]:
+                self._remove_posting(term, page_id)
+        for term, count in terms.items():
+            if old_terms.get(term) != count:
+                self._add_posting(term, page_id, count)
+        self.docs[dest_path] = [page_id, url, title, terms]
+        self.by_id[page_id] = dest_path
+        self.dirty_blocks.add(page_id // PAGE_BLOCK)
+
+    def remove(self, dest_path):
+        page_id, _, _, terms = self.docs.pop(dest_path)
+        for term in terms:
+            self._remove_posting(term, page_id)
+        del self.by_id[page_id]
+        heapq.heappush(self.free_ids, page_id)
+        self.dirty_blocks.add(page_id // PAGE_BLOCK)
+
+    def sync(self, pages):
+        # Drop the pages that are no longer part of the site
+        for dest_path in sorted(set(self.docs) - set(pages)):
+            self.remove(dest_path)
+
+    def shard_bytes(self, name):
+        return _json_bytes(
+            {
+                term: encode_postings(self.postings[term])
+                for term in sorted(self.shards[name])
+            }
+        )
+
+    def block_bytes(self, block):
+        pages = []
+        for page_id in range(block * PAGE_BLOCK, (block + 1) * PAGE_BLOCK):
+            if page_id >= self.next_id:
+                break
+            dest_path = self.by_id.get(page_id)
+            if dest_path is None:
+                pages.append(None)
+            else:
+                _, url, title, _ = self.docs[dest_path]
+                pages.append([url, title])
+        return _json_bytes(pages)
+
+    def write(self):
+        # Write the files whose content changed since the last write (or
+        # that are missing) and delete the ones that are no longer needed.
+        # Returns the number of files written.
+        out_dir = os.path.join(self.dest_dir, OUTPUT_DIR)
+        existing = set(os.listdir(out_dir)) if os.path.isdir(out_dir) else set()
+        blocks = (self.next_id + PAGE_BLOCK - 1) // PAGE_BLOCK
+        wanted = {"index.json"}
+        written = 0
+
+        def write_file(name, data):
+            nonlocal written
+            if write_if_changed(os.path.join(out_dir, name), data)[0]:
+                written += 1
+
+        for name in sorted(self.shards):
+            file_name = f"{name}.json"
+            wanted.add(file_name)
+            if name in self.dirty_shards or file_name not in existing:
+                write_file(file_name, self.shard_bytes(name))
+        for block in range(blocks):
+            file_name = f"pages-{block}.json"
+            wanted.add(file_name)
+            if block in self.dirty_blocks or file_name not in existing:
+                write_file(file_name, self.block_bytes(block))
+        write_file(
+            "index.json",
+            _json_bytes(
+                {
+                    "version": FORMAT_VERSION,
+                    "docs": len(self.docs),
+                    "pages": self.next_id,
+                    "block": PAGE_BLOCK,
+                    "shards": sorted(self.shards),
+                }
+            ),
+        )
+        removed = 0
+        for name in sorted(existing - wanted):
+            if name.endswith(".json"):
+                os.remove(os.path.join(out_dir, name))
+                removed += 1
+        self.dirty_shards.clear()
+        self.dirty_blocks.clear()
+        logger.info(
+            "Search index: %d pages, %d terms in %d shards; %d files written, "
+            "%d removed.",
+            len(self.docs),
+            len(self.postings),
+            len(self.shards),
+            written,
+            removed,
+            extra=log.fields(
+                event="search_index_written",
+                pages=len(self.docs),
+                terms=len(self.postings),
+                shards=len(self.shards),
+                written=written,
+                removed=removed,
+            ),
+        )
+        return written
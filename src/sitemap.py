@@ -0,0 +1,224 @@
+import heapq
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+import log
+from output import OutputWriter
+
+logger = log.get_logger("sitemap")
+
+# Limits of a single sitemap file in the sitemaps.org protocol
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+SITEMAP_NAME = "sitemap.xml"
+SHARD_PATTERN = re.compile(r"sitemap-\d+\.xml")
+
+FEED_SECTION = "blog"
+FEED_NAME = "feed.xml"
+FEED_ITEMS = 20
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def page_url(site_url, basepath, rel_path):
+    # Absolute URL of an output, given its path inside the output directory;
+    # an index.html is linked as its directory
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.html":
+        rel_path = ""
+    elif rel_path.endswith("/index.html"):
+        rel_path = rel_path[: -len("index.html")]
+    return site_url.rstrip("/") + basepath + quote(rel_path)
+
+
+def page_date(entry):
+    # The front matter date when it is a valid ISO 8601 date, otherwise the
+    # time the page's source was last modified. Always timezone-aware (UTC
+    # when the date does not say).
+    date = entry.get("date")
+    if date:
+        try:
+            parsed = datetime.fromisoformat(date)
+        except ValueError:
+            logger.warning(
+                "%s: date '%s' is not an ISO 8601 date; using the file's mtime",
+                entry["source"],
+                date,
+                extra=log.fields(event="bad_date", source=entry["source"], date=date),
+            )
+        else:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed
+    return datetime.fromtimestamp(entry["source_mtime_ns"] / 1e9, timezone.utc)
+
+
+def iter_pages(pages, dest_dir):
+    # (path inside dest_dir, manifest entry) for every page, in path order,
+    # read from the page index the build keeps in its manifest
+    by_rel_path = sorted(
+        (os.path.relpath(dest_path, dest_dir), dest_path) for dest_path in pages
+    )
+    for rel_path, dest_path in by_rel_path:
+        yield rel_path, pages[dest_path]
+
+
+def _url_entry(url, date):
+    return (
+        f"<url><loc>{escape(url)}</loc>"
+        f"<lastmod>{date.isoformat(timespec='seconds')}</lastmod></url>\n"
+    )
+
+
+def write_sitemaps(pages, dest_dir, site_url, basepath, max_urls=MAX_URLS):
+    # Stream sitemap.xml for every page, one <url> at a time. Above max_urls
+    # (or MAX_BYTES) the URLs are split across sitemap-1.xml, sitemap-2.xml,
+    # ... and sitemap.xml becomes the index listing them. Shards left over
+    # from a bigger site are deleted. Returns the paths written or kept.
+    sharded = len(pages) > max_urls
+    files = []
+    shards = []  # (path inside dest_dir, newest lastmod)
+    writer = None
+    count = 0
+    newest = None
+
+    def close_shard():
+        writer.write("</urlset>\n")
+        writer.close()
+        files.append(writer.path)
+        if sharded:
+            shards.append((os.path.basename(writer.path), newest))
+
+    try:
+        for rel_path, entry in iter_pages(pages, dest_dir):
+            date = page_date(entry)
+            line = _url_entry(page_url(site_url, basepath, rel_path), date)
+            if writer is not None and sharded and (
+                count >= max_urls or writer.size + len(line) > MAX_BYTES - 16
+            ):
+                close_shard()
+                writer = None
+            if writer is None:
+                name = f"sitemap-{len(shards) + 1}.xml" if sharded else SITEMAP_NAME
+                writer = OutputWriter(os.path.join(dest_dir, name))
+                writer.write(XML_DECLARATION)
+                writer.write(f'<urlset xmlns="{SITEMAP_NS}">\n')
+                count = 0
+                newest = None
+            writer.write(line)
+            count += 1
+            newest = date if newest is None else max(newest, date)
+        if writer is None:
+            # No pages at all: still a valid, empty sitemap
+            writer = OutputWriter(os.path.join(dest_dir, SITEMAP_NAME))
+            writer.write(XML_DECLARATION)
+            writer.write(f'<urlset xmlns="{SITEMAP_NS}">\n')
+        close_shard()
+        writer = None
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+
+    if sharded:
+        with OutputWriter(os.path.join(dest_dir, SITEMAP_NAME)) as index:
+            index.write(XML_DECLARATION)
+            index.write(f'<sitemapindex xmlns="{SITEMAP_NS}">\n')
+            for name, date in shards:
+                url = site_url.rstrip("/") + basepath + name
+                index.write(
+                    f"<sitemap><loc>{escape(url)}</loc>"
+                    f"<lastmod>{date.isoformat(timespec='seconds')}</lastmod>"
+                    "</sitemap>\n"
+                )
+            index.write("</sitemapindex>\n")
+        files.append(index.path)
+
+    current = {name for name, _ in shards}
+    for name in sorted(os.listdir(dest_dir)):
+        if SHARD_PATTERN.fullmatch(name) and name not in current:
+            os.remove(os.path.join(dest_dir, name))
+    logger.info(
+        "Sitemap: %d URLs in %d file(s).",
+        len(pages),
+        max(len(shards), 1),
+        extra=log.fields(event="sitemap_written", urls=len(pages), shards=len(shards)),
+    )
+    return files
+
+
+def write_feed(
+    pages,
+    dest_dir,
+    site_url,
+    basepath,
+    section=FEED_SECTION,
+    limit=FEED_ITEMS,
+):
+    # RSS 2.0 feed of the newest `limit` pages under section/ (blog/ by
+    # default), written to section/feed.xml. Only the newest entries are
+    # kept while scanning the page index, so the cost is flat in the size
+    # of the site. Returns the feed's path, or None when the section has no
+    # pages.
+    prefix = section.strip("/") + "/"
+    section_index = prefix + "index.html"
+    home_title = None
+    section_title = None
+
+    def posts():
+        nonlocal home_title, section_title
+        for rel_path, entry in iter_pages(pages, dest_dir):
+            rel_path = rel_path.replace(os.sep, "/")
+            if rel_path == "index.html":
+                home_title = entry.get("title")
+            elif rel_path == section_index:
+                section_title = entry.get("title")
+            elif rel_path.startswith(prefix):
+                yield page_date(entry), rel_path, entry
+
+    newest = heapq.nlargest(limit, posts(), key=lambda post: (post[0], post[1]))
+    if not newest:
+        return None
+
+    title = section_title or home_title or section.strip("/").capitalize()
+    feed_path = os.path.join(dest_dir, prefix + FEED_NAME)
+    feed_url = page_url(site_url, basepath, prefix + FEED_NAME)
+    with OutputWriter(feed_path) as feed:
+        feed.write(XML_DECLARATION)
+        feed.write(
+            '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">\n'
+            "<channel>\n"
+            f"<title>{escape(title)}</title>\n"
+            f"<link>{escape(page_url(site_url, basepath, section_index))}</link>\n"
+            f"<description>Latest posts from {escape(title)}</description>\n"
+            f'<atom:link href="{escape(feed_url)}" rel="self" '
+            'type="application/rss+xml"/>\n'
+            # The newest post's date, not the build time, so the feed only
+            # changes when its posts do
+            f"<lastBuildDate>{format_datetime(newest[0][0])}</lastBuildDate>\n"
+        )
+        for date, rel_path, entry in newest:
+            url = escape(page_url(site_url, basepath, rel_path))
+            feed.write(
+                "<item>"
+                f"<title>{escape(entry.get('title') or rel_path)}</title>"
+                f"<link>{url}</link>"
+                f'<guid isPermaLink="true">{url}</guid>'
+                f"<pubDate>{format_datetime(date)}</pubDate>"
+                "</item>\n"
+            )
+        feed.write("</channel>\n</rss>\n")
+    logger.info(
+        "Feed: %d posts from %s/ in %s",
+        len(newest),
+        section.strip("/"),
+        feed_path,
+        extra=log.fields(event="feed_written", posts=len(newest), path=feed_path),
+    )
+    return feed_path
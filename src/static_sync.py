@@ -0,0 +1,236 @@
+import errno
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import log
+from manifest import hash_file, remove_empty_dirs
+from output import remove_compressed
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = log.get_logger("static")
+
+# ioctl request number for FICLONE (Linux, from linux/fs.h): share the source
+# file's extents instead of copying data, on filesystems that support it
+FICLONE = 0x40049409
+
+# Errors meaning "this fast path is not available here", as opposed to a
+# real I/O failure that should be reported
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+
+def _copy_file_range(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+        if sent == 0:
+            break
+        copied += sent
+    return copied == size
+
+
+def fast_copy(src_path, dst_path):
+    # Copy data with the cheapest mechanism the kernel offers: a reflink,
+    # then copy_file_range, then shutil's own copy (sendfile on Linux).
+    # The file is written under a unique temporary name and renamed into
+    # place so a reader never sees a partial asset, and two copies to the
+    # same path (a watch rebuild racing a build) never share a file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as fdst, open(src_path, "rb") as fsrc:
+            done = False
+            if fcntl is not None:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                    done = True
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+            if not done and hasattr(os, "copy_file_range"):
+                try:
+                    size = os.fstat(fsrc.fileno()).st_size
+                    done = _copy_file_range(fsrc, fdst, size)
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+                if not done:
+                    fdst.seek(0)
+                    fdst.truncate()
+        if not done:
+            shutil.copyfile(src_path, tmp_path)
+        shutil.copymode(src_path, tmp_path)
+        # Keep the source mtime so the next sync can compare without reading
+        st = os.stat(src_path)
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def list_files(root):
+    # Relative paths of every regular file under root, in a stable order
+    files = []
+    for dir_path, _, file_names in os.walk(root):
+        for name in file_names:
+            path = os.path.join(dir_path, name)
+            if os.path.isfile(path):
+                files.append(os.path.relpath(path, root))
+            else:
+                logger.warning(
+                    "Item '%s' is neither a file nor a directory. Skipping.",
+                    path,
+                    extra=log.fields(event="skipped", path=path),
+                )
+    return sorted(files)
+
+
+def sync_static(src, dst, manifest=None, checksum=False, jobs=None, keep=None):
+    # Bring dst up to date with src without deleting and re-copying
+    # everything: a file is copied only when it is new or its size or mtime
+    # (or, with checksum=True, its content hash) differs from the copy in
+    # dst. Files synced on a previous run that have since been removed from
+    # src are deleted; files dst got from elsewhere (generated pages) are
+    # left alone. keep lists the generated files (relative to dst): with no
+    # trusted record of the last sync, every other file in dst that is not
+    # in src is deleted too.
+    logger.info("Syncing static files from '%s' to '%s'", src, dst)
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"Source directory '{src}' does not exist.")
+    if not os.path.isdir(src):
+        raise NotADirectoryError(f"Source '{src}' is not a directory.")
+    os.makedirs(dst, exist_ok=True)
+
+    previous = manifest.assets if manifest is not None else {}
+    # Files a discarded manifest says were synced are removed all the same
+    stale = manifest.stale_assets if manifest is not None else set()
+    assets = {}
+    to_copy = []
+    for rel_path in list_files(src):
+        src_path = os.path.join(src, rel_path)
+        dst_path = os.path.join(dst, rel_path)
+        st = os.stat(src_path)
+        record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        assets[rel_path] = record
+
+        if checksum:
+            # Reuse the hash from the last sync when the source is untouched
+            old = previous.get(rel_path)
+            if (
+                old
+                and old.get("hash")
+                and old["size"] == st.st_size
+                and old["mtime_ns"] == st.st_mtime_ns
+            ):
+                record["hash"] = old["hash"]
+            else:
+                record["hash"] = hash_file(src_path)
+
+        # Why the copy is needed, kept in the manifest for --why-rebuilt
+        reason = None
+        try:
+            dst_st = os.stat(dst_path)
+        except FileNotFoundError:
+            reason = "output was missing" if rel_path in previous else "new file"
+        else:
+            if dst_st.st_size != st.st_size:
+                reason = f"{src_path} changed"
+            elif checksum:
+                # fast_copy stamps the source's mtime onto the copy, so a copy
+                # whose size and mtime still match the last sync's record is
+                # the one that was hashed then
+                old = previous.get(rel_path)
+                if (
+                    old
+                    and old.get("hash")
+                    and old["size"] == dst_st.st_size
+                    and old["mtime_ns"] == dst_st.st_mtime_ns
+                ):
+                    dst_hash = old["hash"]
+                else:
+                    dst_hash = hash_file(dst_path)
+                if dst_hash != record["hash"]:
+                    reason = f"{src_path} changed"
+            elif dst_st.st_mtime_ns != st.st_mtime_ns:
+                reason = f"{src_path} changed"
+        if reason is not None:
+            to_copy.append(rel_path)
+            if manifest is not None:
+                record["built"] = manifest.build
+                record["reasons"] = [reason]
+        elif rel_path in previous:
+            for key in ("built", "reasons"):
+                if key in previous[rel_path]:
+                    record[key] = previous[rel_path][key]
+
+    for rel_path in to_copy:
+        os.makedirs(os.path.dirname(os.path.join(dst, rel_path)), exist_ok=True)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = [
+            pool.submit(
+                fast_copy, os.path.join(src, rel_path), os.path.join(dst, rel_path)
+            )
+            for rel_path in to_copy
+        ]
+        # Report in path order, whatever order the copies finish in
+        for rel_path, result in zip(to_copy, results):
+            result.result()
+            src_path = os.path.join(src, rel_path)
+            dst_path = os.path.join(dst, rel_path)
+            # Precompressed copies of the old content are stale now
+            remove_compressed(dst_path)
+            logger.info(
+                "copying %s to %s",
+                src_path,
+                dst_path,
+                extra=log.fields(event="asset_copied", source=src_path, dest=dst_path),
+            )
+
+    stale = (set(previous) | stale) - set(assets)
+    if keep is not None and (manifest is None or manifest.reset_reason is not None):
+        # A first run over an existing dst, or a discarded manifest: what
+        # the last sync wrote is unknown, so dst itself is the record
+        stale |= set(list_files(dst)) - set(assets) - set(keep)
+    removed = []
+    for rel_path in sorted(stale):
+        dst_path = os.path.join(dst, rel_path)
+        if os.path.isfile(dst_path):
+            os.remove(dst_path)
+            logger.info(
+                "removing %s",
+                dst_path,
+                extra=log.fields(event="asset_removed", dest=dst_path),
+            )
+        remove_compressed(dst_path)
+        removed.append(rel_path)
+        remove_empty_dirs(dst_path, dst)
+
+    if manifest is not None:
+        manifest.assets = assets
+    logger.info(
+        "Sync complete: %d copied, %d unchanged, %d removed.",
+        len(to_copy),
+        len(assets) - len(to_copy),
+        len(removed),
+        extra=log.fields(
+            event="static_synced",
+            copied=len(to_copy),
+            unchanged=len(assets) - len(to_copy),
+            removed=len(removed),
+        ),
+    )
+    return to_copy, removed
@@ -0,0 +1,76 @@
+import os
+import re
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+ROOT_URL_PATTERN = re.compile(r'(href|src)="/(?!/)')
+
+# The placeholders generate_page fills in; anything else in {{ }} is left as-is
+SLOTS = ("Title", "Content")
+
+
+def prefix_root_urls(html, basepath):
+    # Point the template's own root-relative href/src attributes at the
+    # basepath the site is served under, in a single pass over the text.
+    # Page content gets its basepath from htmlnode while it is serialized.
+    if basepath == "/":
+        return html
+    return ROOT_URL_PATTERN.sub(lambda match: f'{match.group(1)}="{basepath}', html)
+
+
+class Template:
+    def __init__(self, source, basepath="/"):
+        self.basepath = basepath
+        # Alternating static chunks and slot names: chunks[i] comes before
+        # slots[i], and the last chunk closes the document. The basepath is
+        # applied to the static chunks here, once per build.
+        self.slots = []
+        static = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            if match.group(1) not in SLOTS:
+                continue
+            static.append(source[position : match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        static.append(source[position:])
+        self.chunks = [prefix_root_urls(chunk, basepath) for chunk in static]
+
+    def render(self, **values):
+        parts = []
+        self.write(parts, **values)
+        return "".join(parts)
+
+    def write(self, sink, **values):
+        # Streams the page into a list buffer or a file-like object. A value
+        # can be a string or an iterable of chunks (e.g. htmlnode.iter_html),
+        # which is written through without ever being joined. Values are
+        # written as given: content is serialized with the basepath already
+        # applied.
+        write = sink.append if isinstance(sink, list) else sink.write
+        write(self.chunks[0])
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            value = values[slot]
+            if isinstance(value, str):
+                write(value)
+            else:
+                for part in value:
+                    write(part)
+            write(chunk)
+
+
+# (path, basepath) -> (size, mtime_ns, Template)
+_template_cache = {}
+
+
+def load_template(template_path, basepath="/"):
+    # Compile each template once per build; editing the file on disk
+    # (e.g. while watching) invalidates the cached copy
+    st = os.stat(template_path)
+    key = (template_path, basepath)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    with open(template_path, "r") as f:
+        template = Template(f.read(), basepath)
+    _template_cache[key] = (st.st_size, st.st_mtime_ns, template)
+    return template
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.corpus import generate_corpus, generate_inline_samples, generate_site
+from inline_markdown import BlockType, block_to_block_type, markdown_to_blocks
+from inline_markdown import markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        self.assertEqual(generate_corpus(seed=3, documents=5), generate_corpus(3, 5))
+        self.assertNotEqual(generate_corpus(seed=3, documents=5), generate_corpus(4, 5))
+
+    def test_corpus_parses_and_covers_every_block_type(self):
+        seen = set()
+        for doc in generate_corpus(seed=0, documents=20):
+            markdown_to_html_node(doc).to_html()
+            seen.update(block_to_block_type(b) for b in markdown_to_blocks(doc))
+        self.assertEqual(seen, set(BlockType))
+
+    def test_inline_samples_parse(self):
+        for text in generate_inline_samples(seed=0, count=200, density=0.9):
+            markdown_to_html_node(text)
+
+    def test_generate_site_layout(self):
+        root = tempfile.mkdtemp()
+        try:
+            content_dir, template_path = generate_site(root, 150)
+            self.assertTrue(os.path.isfile(template_path))
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(content_dir, "section-001", "page-000149", "index.md")
+                )
+            )
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
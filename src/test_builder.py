@@ -0,0 +1,132 @@
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import log
+from builder import Site, output_path_for
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css">{{ Content }}'
+
+
+class TestSite(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.test_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_build_from_strings(self):
+        site = Site(TEMPLATE, basepath="/repo/")
+        site.add_page("index.html", "# Home\n\n[about](/about/)")
+        site.add_asset("index.css", "body {}")
+        self.assertEqual(
+            site.build(),
+            {
+                "index.css": b"body {}",
+                "index.html": b'<title>Home</title><link href="/repo/index.css">'
+                b'<div><h1>Home</h1><p><a href="/repo/about/">about</a></p></div>',
+            },
+        )
+
+    def test_build_from_directories(self):
+        template_path = self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post/index.md", "# Post")
+        self.write("content/notes.txt", "not a page")
+        self.write("static/images/a.png", "png")
+        site = Site(template_path=template_path)
+        site.add_content(os.path.join(self.test_dir, "content"))
+        site.add_static(os.path.join(self.test_dir, "static"))
+        outputs = site.build()
+        self.assertEqual(
+            sorted(outputs), ["blog/post/index.html", "images/a.png", "index.html"]
+        )
+        self.assertIn(b"<h1>Post</h1>", outputs["blog/post/index.html"])
+        # Nothing is written next to the sources
+        self.assertEqual(
+            sorted(os.listdir(self.test_dir)), ["content", "static", "template.html"]
+        )
+
+    def test_paths_are_read_at_build_time(self):
+        path = self.write("content/index.md", "# One")
+        site = Site(TEMPLATE)
+        site.add_page("index.html", path=path)
+        self.assertIn(b"One", site.build()["index.html"])
+        self.write("content/index.md", "# Two")
+        self.assertIn(b"Two", site.build()["index.html"])
+
+    def test_page_without_title_names_the_page(self):
+        site = Site(TEMPLATE)
+        site.add_page("draft.html", "no heading")
+        with self.assertRaisesRegex(ValueError, "draft.html: no h1 header"):
+            site.build()
+
+    def test_source_must_be_text_or_path(self):
+        site = Site(TEMPLATE)
+        with self.assertRaises(ValueError):
+            site.add_page("index.html")
+        with self.assertRaises(ValueError):
+            site.add_asset("a.css", "x", path="a.css")
+        with self.assertRaises(ValueError):
+            Site()
+
+    def test_render_single_page(self):
+        self.assertEqual(
+            Site("{{ Content }}").render("# Hi"), b"<div><h1>Hi</h1></div>"
+        )
+
+    def test_output_path_for(self):
+        self.assertEqual(
+            output_path_for(os.path.join("blog", "index.md")), "blog/index.html"
+        )
+
+
+class TestLogging(unittest.TestCase):
+    def tearDown(self):
+        log.root.handlers[:] = [logging.NullHandler()]
+        log.root.setLevel(logging.NOTSET)
+        log.root.propagate = True
+
+    def test_silent_by_default(self):
+        self.assertFalse(log.get_logger("build").isEnabledFor(logging.INFO))
+
+    def test_text_lines(self):
+        stream = io.StringIO()
+        log.configure(logging.INFO, stream=stream)
+        logger = log.get_logger("build")
+        logger.debug("hidden")
+        logger.info("Generated %s", "a.html", extra=log.fields(dest="a.html"))
+        logger.warning("odd file")
+        self.assertEqual(stream.getvalue(), "Generated a.html\nWarning: odd file\n")
+
+    def test_json_lines_carry_fields(self):
+        stream = io.StringIO()
+        log.configure(logging.DEBUG, json_lines=True, stream=stream)
+        log.get_logger("static").info(
+            "copied %d", 2, extra=log.fields(event="static_synced", copied=2)
+        )
+        self.assertEqual(
+            json.loads(stream.getvalue()),
+            {
+                "level": "INFO",
+                "logger": "ssg.static",
+                "message": "copied 2",
+                "event": "static_synced",
+                "copied": 2,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
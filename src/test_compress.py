@@ -0,0 +1,87 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from compress import compress_outputs, gzip_bytes
+from manifest import BuildManifest
+
+PAGE = b"<html>" + b"<p>repeated text</p>" * 200 + b"</html>"
+
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for rel_path, data in [
+            ("index.html", PAGE),
+            ("blog/index.css", b"p { color: red; }" * 50),
+            ("images/a.png", b"\x89PNG" * 100),
+            ("tiny.txt", b"x"),
+            ("archive.tar.gz", b"not ours"),
+        ]:
+            path = os.path.join(self.test_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self.encodings = [(".gz", gzip_bytes)]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def path(self, rel_path):
+        return os.path.join(self.test_dir, rel_path)
+
+    def test_text_outputs_get_gzip_siblings(self):
+        self.assertEqual(compress_outputs(self.test_dir, 2, self.encodings), (2, 0))
+        with gzip.open(self.path("index.html.gz")) as f:
+            self.assertEqual(f.read(), PAGE)
+        self.assertTrue(os.path.exists(self.path("blog/index.css.gz")))
+        self.assertFalse(os.path.exists(self.path("images/a.png.gz")))
+        # Compressing would not make it smaller
+        self.assertFalse(os.path.exists(self.path("tiny.txt.gz")))
+
+    def test_only_changed_outputs_are_recompressed(self):
+        compress_outputs(self.test_dir, 2, self.encodings)
+        self.assertEqual(compress_outputs(self.test_dir, 2, self.encodings), (0, 0))
+        with open(self.path("index.html"), "ab") as f:
+            f.write(b"<!-- changed -->")
+        os.utime(self.path("index.html"), ns=(1, 1))
+        self.assertEqual(compress_outputs(self.test_dir, 2, self.encodings), (1, 0))
+        with gzip.open(self.path("index.html.gz")) as f:
+            self.assertTrue(f.read().endswith(b"<!-- changed -->"))
+
+    def test_outputs_not_worth_compressing_are_remembered(self):
+        compressed = []
+
+        def counting_gzip(data):
+            compressed.append(data)
+            return gzip_bytes(data)
+
+        encodings = [(".gz", counting_gzip)]
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        manifest = BuildManifest(os.path.join(state_dir, "m.json"), "v1")
+        compress_outputs(self.test_dir, 2, encodings, manifest)
+        self.assertEqual(len(compressed), 3)
+        self.assertEqual(list(manifest.incompressible), ["tiny.txt"])
+        manifest.save()
+
+        manifest = BuildManifest.load(manifest.path, "v1")
+        compress_outputs(self.test_dir, 2, encodings, manifest)
+        self.assertEqual(len(compressed), 3)
+        with open(self.path("tiny.txt"), "wb") as f:
+            f.write(b"y")
+        compress_outputs(self.test_dir, 2, encodings, manifest)
+        self.assertEqual(compressed[3:], [b"y"])
+
+    def test_siblings_of_removed_outputs_are_deleted(self):
+        compress_outputs(self.test_dir, 2, self.encodings)
+        os.remove(self.path("blog/index.css"))
+        self.assertEqual(compress_outputs(self.test_dir, 2, self.encodings), (0, 1))
+        self.assertFalse(os.path.exists(self.path("blog/index.css.gz")))
+        self.assertTrue(os.path.exists(self.path("archive.tar.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, iter_html, iter_text, write_html
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -278,6 +279,87 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_to_html_very_deep_tree(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(html.count("</span>"), 5000)
+
+    def test_write_html_to_list_and_file(self):
+        node = ParentNode(
+            "p", [LeafNode("b", "Bold text"), LeafNode(None, "Normal text")]
+        )
+        buffer = []
+        write_html(node, buffer)
+        self.assertEqual(buffer, ["<p>", "<b>Bold text</b>", "Normal text", "</p>"])
+
+        sink = io.StringIO()
+        write_html(node, sink)
+        self.assertEqual(sink.getvalue(), node.to_html())
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_props_html_recomputed_when_props_replaced(self):
+        node = LeafNode("a", "link", {"href": "/one"})
+        self.assertEqual(node.to_html(), '<a href="/one">link</a>')
+        node.props = {"href": "/two", "target": "_blank"}
+        self.assertEqual(node.to_html(), '<a href="/two" target="_blank">link</a>')
+
+    def test_props_html_cached_per_basepath(self):
+        node = LeafNode("a", "link", {"href": "/one"})
+        html = node.props_to_html("/repo/")
+        self.assertEqual(html, ' href="/repo/one"')
+        self.assertIs(node.props_to_html("/repo/"), html)
+        self.assertEqual(node.props_to_html(), ' href="/one"')
+        self.assertEqual(node.props_to_html("/repo/"), html)
+
+    def test_tags_are_interned(self):
+        tag = "".join(["bl", "ockquote"])
+        self.assertIs(LeafNode(tag, "x").tag, LeafNode("blockquote", "y").tag)
+
+    def test_iter_html_reports_invalid_child(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            list(iter_html(node))
+
+    def test_iter_text_skips_markup(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                LeafNode("img", "", {"src": "/a.png", "alt": "alt"}),
+                LeafNode("code", "<b>x</b>"),
+            ],
+        )
+        self.assertEqual(list(iter_text(node)), ["Bold", " text", "<b>x</b>"])
+
+    def test_basepath_prefixes_root_relative_urls(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/blog/"}),
+                LeafNode("img", "", {"src": "/a.png", "alt": "/not-a-url"}),
+                LeafNode("a", "ext", {"href": "https://example.com/"}),
+                LeafNode("a", "cdn", {"href": "//cdn.example/x"}),
+                LeafNode("code", 'href="/literal"'),
+            ],
+        )
+        self.assertEqual(
+            node.to_html("/repo/"),
+            '<p><a href="/repo/blog/">home</a>'
+            '<img src="/repo/a.png" alt="/not-a-url"></img>'
+            '<a href="https://example.com/">ext</a>'
+            '<a href="//cdn.example/x">cdn</a>'
+            '<code>href="/literal"</code></p>',
+        )
+        # The cached attribute string for "/" is not affected
+        self.assertEqual(node.children[0].to_html(), '<a href="/blog/">home</a>')
+
+
 
 if __name__ == "__main__":
     unittest.main()
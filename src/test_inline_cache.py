@@ -0,0 +1,81 @@
+import threading
+import unittest
+
+import inline_cache
+from inline_cache import InlineCache
+from inline_markdown import markdown_to_html_node, text_to_children
+
+
+class TestInlineCache(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = InlineCache(2)
+        cache.put("a", (1,))
+        cache.put("b", (2,))
+        self.assertEqual(cache.get("a"), (1,))  # "b" is now the oldest
+        cache.put("c", (3,))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (1,))
+        self.assertEqual(cache.get("c"), (3,))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertEqual(len(cache), 2)
+
+    def test_take_stats_resets_counts(self):
+        cache = InlineCache()
+        cache.get("x")
+        cache.put("x", ())
+        cache.get("x")
+        self.assertEqual(cache.take_stats(), (1, 1, 1))
+        self.assertEqual(cache.take_stats(), (0, 0, 1))
+        cache.add_stats(5, 2)
+        self.assertIn("5 hits, 2 misses", cache.summary())
+        cache.add_stats(0, 0, 3, worker=101)
+        cache.add_stats(0, 0, 4, worker=102)
+        cache.add_stats(0, 0, 5, worker=101)
+        self.assertIn("9 entries in 2 worker caches of 4096", cache.summary())
+
+    def test_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            InlineCache(0)
+
+    def test_concurrent_use_keeps_counts_and_bound(self):
+        cache = InlineCache(50)
+
+        def work(offset):
+            for i in range(2000):
+                key = str((i + offset) % 100)
+                if cache.get(key) is None:
+                    cache.put(key, (key,))
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.hits + cache.misses, 16000)
+        self.assertEqual(len(cache), 50)
+
+
+class TestCachedInlineRendering(unittest.TestCase):
+    def setUp(self):
+        self.cache = inline_cache.enable(16)
+
+    def tearDown(self):
+        inline_cache.disable()
+
+    def test_repeated_text_is_parsed_once(self):
+        first = text_to_children("a **b** [c](/d)")
+        second = text_to_children("a **b** [c](/d)")
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_output_matches_uncached(self):
+        md = "- same _item_\n- same _item_\n\nsame _item_\n\n> same _item_"
+        cached = markdown_to_html_node(md).to_html()
+        inline_cache.disable()
+        self.assertEqual(markdown_to_html_node(md).to_html(), cached)
+        self.assertEqual(self.cache.hits, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
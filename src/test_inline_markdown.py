@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from textnode import *
@@ -315,6 +316,22 @@ class TestInlineMarkdown(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_link_skips_images(self):
+        node = TextNode("![same](u) then [same](u)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![same](u) then ", TextType.TEXT),
+                TextNode("same", TextType.LINK, "u"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_many_links(self):
+        text = ", ".join(f"[l{i}](/p{i})" for i in range(500))
+        new_nodes = split_nodes_link([TextNode(text, TextType.TEXT)])
+        self.assertEqual(len(new_nodes), 999)
+        self.assertEqual(new_nodes[-1], TextNode("l499", TextType.LINK, "/p499"))
+
     def test_text_to_textnodes(self):
         text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         new_text = text_to_textnodes(text)
@@ -336,6 +353,40 @@ class TestInlineMarkdown(unittest.TestCase):
             new_text,
         )
 
+    def test_text_to_textnodes_matches_staged_splitters(self):
+        texts = [
+            "",
+            "plain text only",
+            "**bold** and **more bold**",
+            "a `code` b _italic_ c",
+            "_italic with `backticks`_",
+            "**bold with [link](url)** then [link](url)",
+            "![img](a.png)[link](b)![img2](c.png)",
+            "[**bold**](not-a-link)",
+            "****",
+            "a``b",
+        ]
+        for text in texts:
+            staged = [TextNode(text, TextType.TEXT)]
+            staged = split_nodes_delimiter(staged, "**", TextType.BOLD)
+            staged = split_nodes_delimiter(staged, "_", TextType.ITALIC)
+            staged = split_nodes_delimiter(staged, "`", TextType.CODE)
+            staged = split_nodes_image(staged)
+            staged = split_nodes_link(staged)
+            self.assertListEqual(text_to_textnodes(text), staged, text)
+
+    def test_text_to_textnodes_unterminated_delimiters(self):
+        for text, delimiter in [
+            ("**bold", "**"),
+            ("_a **b** c_", "_"),
+            ("`a_b`", "_"),
+            ("`code", "`"),
+            ("**a _b and `c", "**"),
+        ]:
+            with self.assertRaises(ValueError) as cm:
+                text_to_textnodes(text)
+            self.assertIn(f"'{delimiter}'", str(cm.exception))
+
     def test_markdown_to_blocks(self):
         md = """
 This is **bolded** paragraph
@@ -399,6 +450,46 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         blocks = markdown_to_blocks(md)
         self.assertEqual(blocks, [])
 
+    def test_markdown_to_blocks_keeps_fenced_code_together(self):
+        md = "Intro\n\n```\ndef f():\n\n    return 1\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["Intro", "```\ndef f():\n\n    return 1\n```", "Outro"],
+        )
+
+    def test_markdown_to_blocks_unclosed_fence_splits_on_blank_lines(self):
+        md = "```\ncode\n\nmore"
+        self.assertEqual(markdown_to_blocks(md), ["```\ncode", "more"])
+
+    def test_large_fences_split_in_linear_time(self):
+        # Every blank line inside a fence starts a chunk the fence swallows;
+        # rejoining them as they come made this quadratic (seconds per MB)
+        closed = "```\n" + "line\n\n" * 400_000 + "```"
+        unclosed = "```\n\n" + "para\n\n" * 100_000
+        start = time.perf_counter()
+        self.assertEqual(list(iter_blocks(closed)), [(closed, BlockType.CODE)])
+        self.assertEqual(len(markdown_to_blocks(unclosed)), 100_001)
+        self.assertLess(time.perf_counter() - start, 3)
+
+    def test_iter_blocks_kinds(self):
+        md = "  # Title  \n\n```\na\n\nb\n```\n\ntext\n\n```\n\nc\n```\nafter"
+        self.assertEqual(
+            list(iter_blocks(md)),
+            [
+                ("# Title", None),
+                ("```\na\n\nb\n```", BlockType.CODE),
+                ("text", None),
+                ("```\n\nc\n```\nafter", None),
+            ],
+        )
+
+    def test_fenced_code_with_blank_lines_renders_as_one_pre(self):
+        md = "```\nline one\n\nline three\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code>line one\n\nline three\n</code></pre></div>",
+        )
+
     def test_block_to_block_heading(self):
         heading1 = "# This is just a heading"
         heading2 = "## Ths is just a heading"
@@ -412,12 +503,12 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         block_type4 = block_to_block_type(heading4)
         block_type5 = block_to_block_type(heading5)
         block_type6 = block_to_block_type(heading6)
-        self.assertEqual(block_type1, "heading")
-        self.assertEqual(block_type2, "heading")
-        self.assertEqual(block_type3, "heading")
-        self.assertEqual(block_type4, "heading")
-        self.assertEqual(block_type5, "heading")
-        self.assertEqual(block_type6, "heading")
+        self.assertEqual(block_type1, BlockType.HEADING)
+        self.assertEqual(block_type2, BlockType.HEADING)
+        self.assertEqual(block_type3, BlockType.HEADING)
+        self.assertEqual(block_type4, BlockType.HEADING)
+        self.assertEqual(block_type5, BlockType.HEADING)
+        self.assertEqual(block_type6, BlockType.HEADING)
 
     def test_block_to_block_code(self):
         code1 = "```code```"
@@ -431,10 +522,10 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         block_type2 = block_to_block_type(code2)
         block_type3 = block_to_block_type(code3)
         block_type4 = block_to_block_type(code4)
-        self.assertEqual(block_type1, "code")
-        self.assertEqual(block_type2, "code")
-        self.assertEqual(block_type3, "code")
-        self.assertEqual(block_type4, "code")
+        self.assertEqual(block_type1, BlockType.CODE)
+        self.assertEqual(block_type2, BlockType.CODE)
+        self.assertEqual(block_type3, BlockType.CODE)
+        self.assertEqual(block_type4, BlockType.CODE)
 
     def test_block_to_block_quote(self):
         quote1 = "> quote"
@@ -443,9 +534,9 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         block_type1 = block_to_block_type(quote1)
         block_type2 = block_to_block_type(quote2)
         block_type3 = block_to_block_type(quote3)
-        self.assertEqual(block_type1, "quote")
-        self.assertEqual(block_type2, "quote")
-        self.assertEqual(block_type3, "quote")
+        self.assertEqual(block_type1, BlockType.QUOTE)
+        self.assertEqual(block_type2, BlockType.QUOTE)
+        self.assertEqual(block_type3, BlockType.QUOTE)
 
     def test_block_to_block_unordered_list(self):
         unordered_list1 = "- list"
@@ -454,14 +545,14 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         block_type1 = block_to_block_type(unordered_list1)
         block_type2 = block_to_block_type(unordered_list2)
         block_type3 = block_to_block_type(unordered_list3)
-        self.assertEqual(block_type1, "unordered_list")
-        self.assertEqual(block_type2, "unordered_list")
-        self.assertEqual(block_type3, "unordered_list")
+        self.assertEqual(block_type1, BlockType.UNORDERED_LIST)
+        self.assertEqual(block_type2, BlockType.UNORDERED_LIST)
+        self.assertEqual(block_type3, BlockType.UNORDERED_LIST)
 
     def test_block_to_block_ordered_list(self):
         ordered_list1 = "1. list\n2. d cane\n3. put it down"
         block_type1 = block_to_block_type(ordered_list1)
-        self.assertEqual(block_type1, "ordered_list")
+        self.assertEqual(block_type1, BlockType.ORDERED_LIST)
 
     def test_block_to_block_paragraph(self):
         paragraph1 = "hello world"
@@ -474,28 +565,36 @@ This is a paragraph of text. It has some **bold** and _italic_ words inside of i
         block_type3 = block_to_block_type(paragraph3)
         block_type4 = block_to_block_type(paragraph4)
         block_type5 = block_to_block_type(paragraph5)
-        self.assertEqual(block_type1, "paragraph")
-        self.assertEqual(block_type2, "paragraph")
-        self.assertEqual(block_type3, "paragraph")
-        self.assertEqual(block_type4, "paragraph")
-        self.assertEqual(block_type5, "paragraph")
+        self.assertEqual(block_type1, BlockType.PARAGRAPH)
+        self.assertEqual(block_type2, BlockType.PARAGRAPH)
+        self.assertEqual(block_type3, BlockType.PARAGRAPH)
+        self.assertEqual(block_type4, BlockType.PARAGRAPH)
+        self.assertEqual(block_type5, BlockType.PARAGRAPH)
 
     def test_mixed_line_quote_is_paragraph(self):
         # A true quote block requires ALL lines to start with '>'
         block = "> this is a quote\nthis line is not."
-        self.assertEqual(block_to_block_type(block), "paragraph")
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
     def test_unordered_list_with_asterisk(self):
         block = "- An item\n- Another item"
-        self.assertEqual(block_to_block_type(block), "unordered_list")
+        self.assertEqual(block_to_block_type(block), BlockType.UNORDERED_LIST)
 
     def test_non_sequential_ordered_list_is_paragraph(self):
         block = "1. First item\n3. Third item"  # Skips '2.'
-        self.assertEqual(block_to_block_type(block), "paragraph")
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_block_type_lookalikes_are_paragraphs(self):
+        for block in ["####### seven", "#no space", "-no space", "10. ten", "`code`"]:
+            self.assertIs(block_to_block_type(block), BlockType.PARAGRAPH, block)
+
+    def test_long_ordered_list(self):
+        block = "\n".join(f"{i}. item" for i in range(1, 13))
+        self.assertIs(block_to_block_type(block), BlockType.ORDERED_LIST)
 
     def test_embedded_heading_is_paragraph(self):
         block = "This is not a heading\n# But this looks like one"
-        self.assertEqual(block_to_block_type(block), "paragraph")
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
     def test_paragraphs(self):
         md = """
@@ -611,6 +710,32 @@ Random text here
             "<div><h1>This is a heading</h1><p>This is a paragraph of text. It has some <b>bold</b> and <i>italic</i> words inside of it.</p><blockquote>This is the first list item in a list block</blockquote><p>Random text here</p><h2>hi</h2><h3>how are you</h3><h4>good wbu</h4><h5>awesome</h5><h6>lol</h6></div>",
         )
 
+    def test_document_title_and_first_heading(self):
+        md = "## Intro\n\n# The Title \n\nText\n\n# Another h1"
+        document = markdown_to_document(md)
+        self.assertEqual(document.title, "The Title")
+        self.assertEqual(document.first_heading, (2, "Intro"))
+        self.assertEqual(document.metadata, {})
+        self.assertEqual(document.node, markdown_to_html_node(md))
+
+    def test_document_without_h1(self):
+        document = markdown_to_document("Just some paragraph text.\nNo H1 here.")
+        self.assertIsNone(document.title)
+        self.assertIsNone(document.first_heading)
+
+    def test_document_front_matter(self):
+        md = "---\ntitle: 'From front matter'\ndate: 2024-01-02\n---\n\nHello"
+        document = markdown_to_document(md)
+        self.assertEqual(
+            document.metadata, {"title": "From front matter", "date": "2024-01-02"}
+        )
+        self.assertEqual(document.title, "From front matter")
+        self.assertEqual(document.node.to_html(), "<div><p>Hello</p></div>")
+
+    def test_unclosed_front_matter_is_content(self):
+        document = markdown_to_document("---\ntitle: x")
+        self.assertEqual(document.metadata, {})
+
 
 if __name__ == "__main__":
     unittest.main()
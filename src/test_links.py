@@ -0,0 +1,82 @@
+import os
+import unittest
+
+from inline_markdown import markdown_to_document
+from links import LinkChecker, link_lines, link_target, node_links, piece_links
+from parse_cache import body_parts
+
+MARKDOWN = """# Title
+
+[home](/) and [ext](https://example.com/) and [rel](notes.html)
+
+![img](/images/a.png)
+
+`[code](/not-a-link)`
+
+- [again](/) [post](/blog/post/#top)
+"""
+
+
+class TestLinks(unittest.TestCase):
+    def test_node_and_piece_links_agree(self):
+        node = markdown_to_document(MARKDOWN).node
+        urls = ["/", "/images/a.png", "/", "/blog/post/#top"]
+        self.assertEqual(node_links(node), urls)
+        self.assertEqual(piece_links(body_parts(node)), urls)
+
+    def test_link_lines(self):
+        urls = ["/", "/images/a.png", "/", "/blog/post/#top", "/generated"]
+        self.assertEqual(
+            link_lines(MARKDOWN, urls),
+            [
+                ["/", 3],
+                ["/images/a.png", 5],
+                ["/", 9],
+                ["/blog/post/#top", 9],
+                ["/generated", None],
+            ],
+        )
+
+    def test_link_target(self):
+        self.assertEqual(link_target("/"), "index.html")
+        self.assertEqual(link_target("/blog/tom/?x=1#y"), "blog/tom/index.html")
+        self.assertEqual(link_target("/images/a%20b.png"), "images/a b.png")
+        self.assertEqual(link_target("/blog/../index.css"), "index.css")
+
+    def test_check_reports_broken_links(self):
+        dest_dir = "docs"
+        pages = {
+            os.path.join(dest_dir, "index.html"): {
+                "source": "content/index.md",
+                "links": [
+                    ["/blog/tom", 3],
+                    ["/blog/tom/", 4],
+                    ["/images/a.png", 5],
+                    ["/sitemap.xml", 6],
+                    ["/blog/gone/", 7],
+                    ["/images/missing.png", None],
+                ],
+            },
+            os.path.join(dest_dir, "blog", "tom", "index.html"): {
+                "source": "content/blog/tom/index.md",
+            },
+        }
+        assets = {os.path.join("images", "a.png"): {}}
+        extra = [os.path.join(dest_dir, "sitemap.xml")]
+        with self.assertLogs("ssg.links", "WARNING") as logs:
+            broken = LinkChecker().check(pages, assets, dest_dir, extra)
+        self.assertEqual(
+            broken,
+            [
+                ("content/index.md", 7, "/blog/gone/"),
+                ("content/index.md", None, "/images/missing.png"),
+            ],
+        )
+        self.assertEqual(
+            logs.output[0],
+            "WARNING:ssg.links:content/index.md:7: broken link /blog/gone/",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from main import (
+    build_pages,
+    collect_pages,
+    normalize_basepath,
+    parse_args,
+    rebuild_changed,
+)
+from links import LinkChecker
+from manifest import BuildManifest
+from search import SearchIndex
+
+import inline_cache
+import parse_cache
+
+
+class TestBuildPages(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.test_dir, "content")
+        self.template_path = os.path.join(self.test_dir, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write(
+                '<title>{{ Title }}</title><link href="/index.css" /><article>{{ Content }}</article>'
+            )
+        for rel_path, body in [
+            ("index.md", "# Home\n\n[Blog](/blog/)"),
+            ("blog/b/index.md", "# B\n\nSome **bold** text"),
+            ("blog/a/index.md", "# A\n\n![img](/images/a.png)"),
+            ("blog/notes.txt", "not markdown"),
+        ]:
+            path = os.path.join(self.content_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(body)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def read_outputs(self, dest_dir):
+        outputs = {}
+        for root, _, files in os.walk(dest_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path) as f:
+                    outputs[os.path.relpath(path, dest_dir)] = f.read()
+        return outputs
+
+    def test_collect_pages_is_sorted(self):
+        dest_dir = os.path.join(self.test_dir, "docs")
+        pages = collect_pages(self.content_dir, dest_dir)
+        self.assertEqual(
+            [os.path.relpath(dest, dest_dir) for _, dest in pages],
+            ["blog/a/index.html", "blog/b/index.html", "index.html"],
+        )
+
+    def test_parallel_output_matches_sequential(self):
+        outputs = []
+        for jobs, queue_depth in ((1, 1), (1, 8), (3, 8)):
+            dest_dir = os.path.join(self.test_dir, f"docs{len(outputs)}")
+            pages = collect_pages(self.content_dir, dest_dir)
+            build_pages(pages, self.template_path, "/site/", None, jobs, queue_depth)
+            outputs.append(self.read_outputs(dest_dir))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertIn('href="/site/blog/"', outputs[0]["index.html"])
+
+    def test_parallel_build_reports_inline_cache_stats(self):
+        cache = inline_cache.enable(64)
+        try:
+            dest_dir = os.path.join(self.test_dir, "docs")
+            pages = collect_pages(self.content_dir, dest_dir)
+            build_pages(pages, self.template_path, "/", jobs=2)
+        finally:
+            inline_cache.disable()
+        self.assertEqual(cache.misses, 6)
+        # Every miss was cached by the worker that had it
+        self.assertIn("6 entries in", cache.summary())
+
+    def test_parse_cache_is_shared_between_basepaths(self):
+        cache = parse_cache.enable(os.path.join(self.test_dir, "cache"), None, "v1")
+        try:
+            outputs = []
+            for jobs, basepath in ((1, "/site/"), (2, "/site/"), (1, "/other/")):
+                dest_dir = os.path.join(self.test_dir, f"docs{len(outputs)}")
+                pages = collect_pages(self.content_dir, dest_dir)
+                build_pages(pages, self.template_path, basepath, jobs=jobs)
+                outputs.append(self.read_outputs(dest_dir))
+        finally:
+            parse_cache.disable()
+        self.assertEqual((cache.hits, cache.misses), (6, 3))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('href="/other/blog/"', outputs[2]["index.html"])
+
+    def test_basepath_skips_code_that_looks_like_a_link(self):
+        with open(os.path.join(self.content_dir, "index.md"), "w") as f:
+            f.write('# Home\n\n[Blog](/blog/) and `<a href="/x">`')
+        dest_dir = os.path.join(self.test_dir, "docs")
+        pages = collect_pages(self.content_dir, dest_dir)
+        build_pages(pages, self.template_path, "/site/")
+        html = self.read_outputs(dest_dir)["index.html"]
+        self.assertIn('<link href="/site/index.css" />', html)
+        self.assertIn('<a href="/site/blog/">Blog</a>', html)
+        self.assertIn('<code><a href="/x"></code>', html)
+
+    def test_search_index_is_passed_in(self):
+        dest_dir = os.path.join(self.test_dir, "docs")
+        index = SearchIndex(dest_dir)
+        pages = collect_pages(self.content_dir, dest_dir)
+        build_pages(pages, self.template_path, "/", search_index=index)
+        for _, dest_path in pages:
+            self.assertIn(dest_path, index)
+        self.assertEqual(len(index.postings["bold"]), 1)
+
+    def test_link_checker_is_passed_in(self):
+        dest_dir = os.path.join(self.test_dir, "docs")
+        manifest = BuildManifest(os.path.join(self.test_dir, "m.json"), "v1")
+        pages = collect_pages(self.content_dir, dest_dir)
+        build_pages(pages, self.template_path, "/", manifest)
+        # Pages built without the checker have to record their links
+        stale = build_pages(
+            pages, self.template_path, "/", manifest, link_checker=LinkChecker()
+        )
+        self.assertEqual(len(stale), 3)
+        index = os.path.join(dest_dir, "index.html")
+        self.assertEqual(manifest.pages[index]["links"], [["/blog/", 3]])
+
+    def test_unchanged_pages_are_skipped(self):
+        dest_dir = os.path.join(self.test_dir, "docs")
+        manifest = BuildManifest(os.path.join(self.test_dir, "m.json"), "v1")
+        pages = collect_pages(self.content_dir, dest_dir)
+        self.assertEqual(len(build_pages(pages, self.template_path, "/", manifest)), 3)
+        self.assertEqual(build_pages(pages, self.template_path, "/", manifest), [])
+
+        with open(os.path.join(self.content_dir, "index.md"), "a") as f:
+            f.write("\n\nMore text")
+        self.assertEqual(
+            build_pages(pages, self.template_path, "/", manifest),
+            [(pages[2][0], pages[2][1])],
+        )
+
+    def test_identical_output_is_not_rewritten(self):
+        dest_dir = os.path.join(self.test_dir, "docs")
+        pages = collect_pages(self.content_dir, dest_dir)
+        build_pages(pages, self.template_path, "/")
+        for _, dest_path in pages:
+            os.utime(dest_path, ns=(1, 1))
+        # Without a manifest every page is rendered again, but none differs
+        build_pages(pages, self.template_path, "/")
+        for _, dest_path in pages:
+            self.assertEqual(os.stat(dest_path).st_mtime_ns, 1)
+
+    def test_rebuild_changed_only_touches_affected_pages(self):
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            os.makedirs("static")
+            manifest = BuildManifest("m.json", "v1")
+            pages = collect_pages("content", "docs")
+            build_pages(pages, "template.html", "/", manifest)
+            inventory = dict(pages)
+
+            os.remove("content/blog/a/index.md")
+            with open("content/new.md", "w") as f:
+                f.write("# New")
+            rebuild_changed(
+                {"content/blog/a/index.md", "content/new.md"},
+                inventory,
+                "/",
+                manifest,
+            )
+            self.assertFalse(os.path.exists("docs/blog/a/index.html"))
+            self.assertTrue(os.path.exists("docs/new.html"))
+            self.assertEqual(
+                sorted(inventory),
+                ["content/blog/b/index.md", "content/index.md", "content/new.md"],
+            )
+            self.assertEqual(sorted(manifest.pages), sorted(inventory.values()))
+        finally:
+            os.chdir(cwd)
+
+    def test_rebuild_changed_follows_template_dependency(self):
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            os.makedirs("static")
+            manifest = BuildManifest("m.json", "v1")
+            pages = collect_pages("content", "docs")
+            build_pages(pages, "template.html", "/", manifest)
+            with open("template.html", "a") as f:
+                f.write("<footer></footer>")
+            rebuild_changed({"./template.html"}, dict(pages), "/", manifest)
+            for _, dest_path in pages:
+                self.assertEqual(
+                    manifest.pages[dest_path]["reasons"], ["template.html changed"]
+                )
+                self.assertEqual(manifest.pages[dest_path]["built"], 2)
+        finally:
+            os.chdir(cwd)
+
+    def test_rebuild_changed_checks_every_page_after_overflow(self):
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            os.makedirs("static")
+            manifest = BuildManifest("m.json", "v1")
+            pages = collect_pages("content", "docs")
+            build_pages(pages, "template.html", "/", manifest)
+            with open("content/index.md", "a") as f:
+                f.write("\n\nEdited while events were dropped")
+            # An overflow only reports the watched directories
+            rebuild_changed({"content", "content/blog", "."}, dict(pages), "/", manifest)
+            with open("docs/index.html") as f:
+                self.assertIn("Edited while events were dropped", f.read())
+            self.assertEqual(manifest.pages["docs/index.html"]["built"], 2)
+            self.assertEqual(manifest.pages["docs/blog/a/index.html"]["built"], 1)
+        finally:
+            os.chdir(cwd)
+
+
+class TestArgs(unittest.TestCase):
+    def test_normalize_basepath(self):
+        self.assertEqual(normalize_basepath("/"), "/")
+        self.assertEqual(normalize_basepath("repo"), "/repo/")
+        self.assertEqual(normalize_basepath("/repo"), "/repo/")
+
+    def test_parse_args(self):
+        args = parse_args(["repo", "--jobs", "4"])
+        self.assertEqual(args.basepath, "/repo/")
+        self.assertEqual(args.jobs, 4)
+        self.assertEqual(parse_args([]).basepath, "/")
+        self.assertGreaterEqual(parse_args(["-j", "0"]).jobs, 1)
+        self.assertEqual(parse_args([]).inline_cache, 0)
+        self.assertEqual(parse_args(["--queue-depth", "2"]).queue_depth, 2)
+        self.assertEqual(parse_args(["--inline-cache", "10"]).inline_cache, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
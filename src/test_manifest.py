@@ -0,0 +1,194 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from manifest import BuildManifest, hash_bytes, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir, "manifest.json")
+        self.src = os.path.join(self.test_dir, "index.md")
+        self.dest = os.path.join(self.test_dir, "index.html")
+        with open(self.src, "w") as f:
+            f.write("# Title")
+        with open(self.dest, "w") as f:
+            f.write("<h1>Title</h1>")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def record(self, manifest):
+        source_hash = manifest.source_hash(self.src, self.dest)
+        manifest.record(self.src, self.dest, self.inputs(source_hash), "/")
+        return source_hash
+
+    def inputs(self, source_hash, template_hash="tmpl"):
+        return {self.src: source_hash, "template.html": template_hash}
+
+    def test_hash_file_matches_hash_bytes(self):
+        self.assertEqual(hash_file(self.src), hash_bytes(b"# Title"))
+
+    def test_fresh_after_save_and_load(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        source_hash = self.record(manifest)
+        manifest.save()
+
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v1")
+        self.assertFalse(
+            loaded.stale_reasons(self.src, self.dest, self.inputs(source_hash), "/")
+        )
+
+    def test_page_info_survives_save_and_load(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        source_hash = manifest.source_hash(self.src, self.dest)
+        info = {"title": "Title", "date": "2024-05-01"}
+        manifest.record(self.src, self.dest, self.inputs(source_hash), "/", info=info)
+        manifest.save()
+
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v1")
+        self.assertEqual(loaded.pages[self.dest]["title"], "Title")
+        self.assertEqual(loaded.pages[self.dest]["date"], "2024-05-01")
+
+    def test_source_saved_during_build_is_rehashed(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        st = os.stat(self.src)
+        source_hash = manifest.source_hash(self.src, self.dest, st)
+        # Saved after it was hashed, before the page was recorded
+        with open(self.src, "w") as f:
+            f.write("# New title")
+        manifest.record(
+            self.src, self.dest, self.inputs(source_hash), "/", source_st=st
+        )
+        self.assertEqual(
+            manifest.source_hash(self.src, self.dest), hash_bytes(b"# New title")
+        )
+
+    def test_stale_when_inputs_change(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        source_hash = self.record(manifest)
+        self.assertTrue(
+            manifest.stale_reasons(
+                self.src, self.dest, self.inputs(source_hash, "other"), "/"
+            )
+        )
+        self.assertTrue(
+            manifest.stale_reasons(
+                self.src, self.dest, self.inputs(source_hash), "/blog/"
+            )
+        )
+        self.assertTrue(
+            manifest.stale_reasons(
+                self.src, self.dest, self.inputs(hash_bytes(b"x")), "/"
+            )
+        )
+
+    def test_stale_when_output_edited_or_missing(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        source_hash = self.record(manifest)
+        with open(self.dest, "w") as f:
+            f.write("<h1>Edited by hand</h1>")
+        self.assertTrue(
+            manifest.stale_reasons(self.src, self.dest, self.inputs(source_hash), "/")
+        )
+        os.remove(self.dest)
+        self.assertTrue(
+            manifest.stale_reasons(self.src, self.dest, self.inputs(source_hash), "/")
+        )
+
+    def test_stale_reasons_name_what_changed(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.assertEqual(
+            manifest.stale_reasons(self.src, self.dest, {}, "/"), ["no previous build"]
+        )
+        source_hash = self.record(manifest)
+        self.assertEqual(
+            manifest.stale_reasons(
+                self.src, self.dest, self.inputs(source_hash, "new"), "/blog/"
+            ),
+            ["template.html changed", "basepath changed from / to /blog/"],
+        )
+        self.assertEqual(
+            manifest.stale_reasons(self.src, self.dest, {self.src: source_hash}, "/"),
+            ["no longer depends on template.html"],
+        )
+
+    def test_dependents(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.record(manifest)
+        self.assertEqual(manifest.dependents("./template.html"), [self.dest])
+        self.assertEqual(manifest.dependents(self.src), [self.dest])
+        self.assertEqual(manifest.dependents("other.html"), [])
+
+    def test_why_rebuilt_survives_later_builds(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        source_hash = manifest.source_hash(self.src, self.dest)
+        manifest.record(
+            self.src, self.dest, self.inputs(source_hash), "/", ["template.html changed"]
+        )
+        manifest.save()
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v1")
+        self.assertEqual(loaded.build, 2)
+        lines = loaded.why_rebuilt(self.dest)
+        self.assertIn("rebuilt in the last build (#1)", lines[0])
+        self.assertIn("  - template.html changed", lines)
+        self.assertIn("  template.html (sha256 tmpl)", lines)
+
+        loaded.save()  # a build in which the page was up to date
+        lines = BuildManifest.load(self.manifest_path, "v1").why_rebuilt(self.dest)
+        self.assertIn("1 build(s) ago", lines[0])
+        self.assertEqual(
+            loaded.why_rebuilt("missing.html"),
+            ["missing.html is not an output of the last build."],
+        )
+
+    def test_generator_change_discards_manifest(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.record(manifest)
+        manifest.save()
+
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v2")
+        self.assertEqual(loaded.pages, {})
+        self.assertEqual(loaded.reset_reason, "generator code changed")
+
+    def test_prune_removes_unseen_outputs(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.record(manifest)
+        manifest.save()
+
+        # A build that never visits the page removes it
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v1")
+        self.assertEqual(loaded.prune(), [self.dest])
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(loaded.pages, {})
+
+    def test_prune_after_reset_removes_old_outputs(self):
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.record(manifest)
+        manifest.save()
+
+        # The generator changed and the page's source was deleted
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v2")
+        self.assertEqual(loaded.reset_reason, "generator code changed")
+        self.assertEqual(loaded.prune(), [self.dest])
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_prune_removes_emptied_directories(self):
+        nested = os.path.join(self.test_dir, "docs", "new", "index.html")
+        os.makedirs(os.path.dirname(nested))
+        shutil.move(self.dest, nested)
+        self.dest = nested
+        manifest = BuildManifest(self.manifest_path, fingerprint="v1")
+        self.record(manifest)
+        manifest.save()
+
+        loaded = BuildManifest.load(self.manifest_path, fingerprint="v1")
+        loaded.prune(os.path.join(self.test_dir, "docs"))
+        self.assertFalse(os.path.exists(os.path.dirname(nested)))
+        self.assertTrue(os.path.isdir(os.path.join(self.test_dir, "docs")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from manifest import BuildManifest, hash_bytes
+from output import BUFFER_CHARS, OutputWriter, write_if_changed
+from static_sync import sync_static
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "a", "index.html")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_creates_missing_file_and_directories(self):
+        self.assertEqual(
+            write_if_changed(self.path, b"<p>x</p>"), (True, hash_bytes(b"<p>x</p>"))
+        )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"<p>x</p>")
+
+    def test_identical_content_keeps_mtime(self):
+        write_if_changed(self.path, b"<p>x</p>")
+        os.utime(self.path, ns=(1, 1))
+        written, _ = write_if_changed(self.path, b"<p>x</p>")
+        self.assertFalse(written)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+
+    def test_same_size_different_content_is_written(self):
+        write_if_changed(self.path, b"<p>x</p>")
+        written, _ = write_if_changed(self.path, b"<p>y</p>")
+        self.assertTrue(written)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"<p>y</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_rewrite_removes_compressed_copies(self):
+        write_if_changed(self.path, b"<p>x</p>")
+        for suffix in (".gz", ".zst"):
+            with open(self.path + suffix, "wb") as f:
+                f.write(b"old")
+        write_if_changed(self.path, b"<p>x</p>")
+        self.assertTrue(os.path.exists(self.path + ".gz"))
+        write_if_changed(self.path, b"<p>y</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_synced_asset_removes_compressed_copies(self):
+        static = os.path.join(self.test_dir, "static")
+        docs = os.path.dirname(self.path)
+        os.makedirs(static)
+        manifest = BuildManifest(os.path.join(self.test_dir, "m.json"), "v1")
+        for name in ("index.css", "old.css"):
+            with open(os.path.join(static, name), "w") as f:
+                f.write("body {}")
+        sync_static(static, docs, manifest)
+        for name in ("index.css", "old.css"):
+            with open(os.path.join(docs, name + ".gz"), "wb") as f:
+                f.write(b"old")
+
+        # One asset is replaced and the other deleted
+        with open(os.path.join(static, "index.css"), "w") as f:
+            f.write("body { color: red }")
+        os.remove(os.path.join(static, "old.css"))
+        sync_static(static, docs, manifest)
+        self.assertEqual(os.listdir(docs), ["index.css"])
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "a", "sitemap.xml")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_streams_and_skips_identical_content(self):
+        with OutputWriter(self.path) as writer:
+            writer.write("<urlset>")
+            writer.write("</urlset>")
+        self.assertTrue(writer.written)
+        os.utime(self.path, ns=(1, 1))
+        with OutputWriter(self.path) as writer:
+            writer.write("<urlset></urlset>")
+        self.assertFalse(writer.written)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["sitemap.xml"])
+
+    def test_small_writes_are_batched(self):
+        chunks = ["<p>é</p>"] * (BUFFER_CHARS // 4)
+        with OutputWriter(self.path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+            self.assertEqual(writer.size, len("".join(chunks).encode("utf-8")))
+            writer.write("<p>end</p>")
+        data = ("".join(chunks) + "<p>end</p>").encode("utf-8")
+        self.assertEqual(writer.hash, hash_bytes(data))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_error_keeps_previous_file(self):
+        with OutputWriter(self.path) as writer:
+            writer.write("old")
+        with self.assertRaises(RuntimeError):
+            with OutputWriter(self.path) as writer:
+                writer.write("new")
+                raise RuntimeError
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["sitemap.xml"])
+
+
+if __name__ == "__main__":
+    unittest.main()
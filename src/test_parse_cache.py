@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from inline_markdown import Document, markdown_to_document
+from htmlnode import iter_html
+from parse_cache import ParseCache, body_parts, join_body, pack_entry, unpack_entry
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(self.test_dir, version="v1")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_entry_round_trip(self):
+        markdown = '---\ntitle: "T"\n---\n## Sub\n\n# Main\n\n[a](/b) ünïcode'
+        document = markdown_to_document(markdown)
+        parts = body_parts(document.node)
+        cached, cached_parts = unpack_entry(pack_entry(document, parts))
+        self.assertEqual(cached, Document(None, "Main", (2, "Sub"), {"title": "T"}))
+        self.assertEqual(cached_parts, parts)
+        self.assertEqual(cached.text, "Sub\nMain\na\n ünïcode")
+
+    def test_body_parts_join_under_any_basepath(self):
+        node = markdown_to_document("[a](/b) ![c](/d.png) [e](f) `href=\"/g\"`").node
+        parts = body_parts(node)
+        for basepath in ("/", "/repo/"):
+            self.assertEqual(
+                join_body(parts, basepath), "".join(iter_html(node, basepath))
+            )
+
+    def test_untitled_document_round_trip(self):
+        cached, parts = unpack_entry(pack_entry(Document(None), [""]))
+        self.assertEqual(cached, Document(None))
+        self.assertEqual(parts, [""])
+
+    def test_get_after_put(self):
+        key = self.cache.key("# Hi")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, Document(None, "Hi", (1, "Hi")), ["<div></div>"])
+        document, parts = self.cache.get(key)
+        self.assertEqual(document.title, "Hi")
+        self.assertEqual(parts, ["<div></div>"])
+        self.assertEqual(self.cache.take_stats(), (1, 1))
+
+    def test_key_depends_on_parser_version(self):
+        other = ParseCache(self.test_dir, version="v2")
+        self.assertNotEqual(self.cache.key("# Hi"), other.key("# Hi"))
+        self.assertEqual(self.cache.key("# Hi"), ParseCache(version="v1").key("# Hi"))
+
+    def test_damaged_entry_is_a_miss_and_removed(self):
+        key = self.cache.key("# Hi")
+        self.cache.put(key, Document(None, "Hi"), ["<div></div>"])
+        path = self.cache.entry_path(key)
+        with open(path, "r+b") as f:
+            f.truncate(10)
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.exists(path))
+
+    def test_evict_removes_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {i}") for i in range(4)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, Document(None, f"Page {i}"), ["x" * 1000])
+            os.utime(self.cache.entry_path(key), ns=(i * 10**9, i * 10**9))
+        self.cache.get(keys[0])  # now the most recently used
+        size = os.path.getsize(self.cache.entry_path(keys[0]))
+        self.cache.max_bytes = 2 * size
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[3]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNone(self.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
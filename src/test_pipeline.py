@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    def setUp(self):
+        self.pages = [(f"src{i}", f"dest{i}") for i in range(20)]
+
+    def test_results_in_page_order(self):
+        def read(from_path, dest_path):
+            time.sleep(0.001 * (hash(from_path) % 3))
+            return from_path.upper()
+
+        results = list(
+            run_pipeline(
+                self.pages,
+                read,
+                lambda source, dest_path: source + "!",
+                lambda dest_path, rendered: (dest_path, rendered),
+                queue_depth=3,
+            )
+        )
+        self.assertEqual(
+            results,
+            [(f"src{i}", f"dest{i}", (f"dest{i}", f"SRC{i}!")) for i in range(20)],
+        )
+
+    def test_reads_stay_within_queue_depth(self):
+        lock = threading.Lock()
+        started = []
+        rendered = []
+        ahead = []
+
+        def read(from_path, dest_path):
+            with lock:
+                started.append(from_path)
+                ahead.append(len(started) - len(rendered))
+            return from_path
+
+        def render(source, dest_path):
+            rendered.append(source)
+            return source
+
+        list(run_pipeline(self.pages, read, render, lambda d, r: r, queue_depth=4))
+        self.assertLessEqual(max(ahead), 5)
+        self.assertEqual(rendered, [from_path for from_path, _ in self.pages])
+
+    def test_reads_overlap(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def read(from_path, dest_path):
+            with lock:
+                active.append(from_path)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(from_path)
+            return from_path
+
+        list(
+            run_pipeline(
+                self.pages, read, lambda s, d: s, lambda d, r: r, queue_depth=8
+            )
+        )
+        self.assertGreater(max(peak), 1)
+
+    def test_errors_reach_the_caller(self):
+        def render(source, dest_path):
+            if dest_path == "dest5":
+                raise ValueError("no h1 header")
+            return source
+
+        done = []
+        with self.assertRaises(ValueError):
+            for result in run_pipeline(
+                self.pages, lambda f, d: f, render, lambda d, r: r, queue_depth=2
+            ):
+                done.append(result[1])
+        self.assertEqual(done, [f"dest{i}" for i in range(5)])
+
+    def test_queue_depth_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            list(run_pipeline(self.pages, None, None, None, queue_depth=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import profiling
+from inline_markdown import markdown_to_document
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = profiling.enable()
+
+    def tearDown(self):
+        profiling.disable()
+
+    def names(self):
+        return [event[0] for event in self.profiler.events]
+
+    def test_disabled_stages_are_noops(self):
+        profiling.disable()
+        with profiling.stage("write"), profiling.accumulate("inline parse"):
+            pass
+        self.assertEqual(self.profiler.events, [])
+
+    def test_stage_records_page(self):
+        with profiling.page("docs/index.html"):
+            with profiling.stage("file read"):
+                pass
+        with profiling.stage("static copy"):
+            pass
+        self.assertEqual(
+            [(event[0], event[1]) for event in self.profiler.events],
+            [("file read", "docs/index.html"), ("static copy", None)],
+        )
+
+    def test_accumulate_records_exclusive_time(self):
+        with profiling.page("p"):
+            start = time.perf_counter_ns()
+            with profiling.accumulate("tree build"):
+                with profiling.accumulate("inline parse"):
+                    time.sleep(0.02)
+            self.profiler.flush_totals(start)
+        durations = {event[0]: event[3] for event in self.profiler.events}
+        self.assertGreaterEqual(durations["inline parse"], 20_000_000)
+        self.assertLess(durations["tree build"], durations["inline parse"])
+
+    def test_parse_stages_recorded(self):
+        with profiling.page("p"):
+            markdown_to_document("# Title\n\nSome **bold** text\n\n- a\n- b")
+        self.assertEqual(
+            self.names(),
+            ["block split", "block classify", "inline parse", "tree build"],
+        )
+
+    def test_chrome_trace_and_summary(self):
+        with profiling.page("docs/a.html"):
+            with profiling.stage("write"):
+                pass
+        trace = self.profiler.chrome_trace()["traceEvents"]
+        self.assertEqual(trace[0]["ph"], "X")
+        self.assertEqual(trace[0]["args"], {"page": "docs/a.html"})
+
+        summary = self.profiler.summary()
+        self.assertIn("write", summary)
+        self.assertIn("docs/a.html", summary)
+
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, "trace.json")
+            self.profiler.export_chrome_trace(path)
+            self.assertTrue(os.path.getsize(path) > 0)
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from manifest import BuildManifest
+from search import (
+    SearchIndex,
+    decode_postings,
+    encode_postings,
+    page_terms,
+    shard_name,
+)
+
+
+class TestTerms(unittest.TestCase):
+    def test_page_terms(self):
+        self.assertEqual(
+            page_terms("Tolkien's *Hobbit*: a hobbit\nTOLKIEN ünïcode"),
+            {"tolkien": 2, "hobbit": 2, "ünïcode": 1},
+        )
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("hobbit"), "ho")
+        self.assertEqual(shard_name("42"), "42")
+        self.assertEqual(shard_name("ünïcode"), "_")
+        self.assertEqual(shard_name("a_b"), "_")
+
+    def test_postings_round_trip(self):
+        postings = {7: 1, 2: 3, 1000: 2}
+        self.assertEqual(encode_postings(postings), [2, 3, 5, 1, 993, 2])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dest_dir = os.path.join(self.test_dir, "docs")
+        self.state_path = os.path.join(self.test_dir, "search.json")
+        self.manifest = BuildManifest(
+            os.path.join(self.test_dir, "manifest.json"), fingerprint="v1"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def dest(self, rel_path):
+        return os.path.join(self.dest_dir, rel_path)
+
+    def read(self, name):
+        with open(os.path.join(self.dest_dir, "search", name)) as f:
+            return json.load(f)
+
+    def new_index(self):
+        return SearchIndex(self.dest_dir, "/repo/", self.state_path, "v1")
+
+    def test_write_shards_and_pages(self):
+        index = self.new_index()
+        index.update(self.dest("index.html"), "Home", {"hobbit": 2, "ring": 1})
+        index.update(self.dest("blog/a.html"), "A", {"hobbit": 1})
+        index.write()
+        self.assertEqual(self.read("ho.json"), {"hobbit": [0, 2, 1, 1]})
+        self.assertEqual(self.read("ri.json"), {"ring": [0, 1]})
+        self.assertEqual(
+            self.read("pages-0.json"),
+            [["/repo/", "Home"], ["/repo/blog/a.html", "A"]],
+        )
+        self.assertEqual(
+            self.read("index.json"),
+            {
+                "version": 1,
+                "docs": 2,
+                "pages": 2,
+                "block": 1000,
+                "shards": ["ho", "ri"],
+            },
+        )
+
+    def test_only_changed_shards_are_rewritten(self):
+        index = self.new_index()
+        index.update(self.dest("index.html"), "Home", {"hobbit": 1, "ring": 1})
+        index.write()
+        ring = os.path.join(self.dest_dir, "search", "ri.json")
+        os.utime(ring, ns=(1, 1))
+        index.update(self.dest("index.html"), "Home", {"hobbit": 3, "ring": 1})
+        self.assertEqual(index.dirty_shards, {"ho"})
+        index.write()
+        self.assertEqual(os.stat(ring).st_mtime_ns, 1)
+        self.assertEqual(self.read("ho.json"), {"hobbit": [0, 3]})
+
+    def test_removed_page_frees_its_id_and_shards(self):
+        index = self.new_index()
+        index.update(self.dest("a.html"), "A", {"hobbit": 1})
+        index.update(self.dest("b.html"), "B", {"ring": 1})
+        index.write()
+        index.sync([self.dest("b.html")])
+        index.write()
+        shard = os.path.join(self.dest_dir, "search", "ho.json")
+        self.assertFalse(os.path.exists(shard))
+        self.assertEqual(self.read("pages-0.json"), [None, ["/repo/b.html", "B"]])
+        index.update(self.dest("c.html"), "C", {"ring": 2})
+        index.write()
+        self.assertEqual(self.read("ri.json"), {"ring": [0, 2, 1, 1]})
+        self.assertEqual(self.read("pages-0.json")[0], ["/repo/c.html", "C"])
+
+    def test_state_is_reused_by_the_next_build(self):
+        index = self.new_index()
+        index.update(self.dest("a.html"), "A", {"hobbit": 1})
+        index.save(self.manifest.build)
+        self.manifest.save()
+
+        manifest = BuildManifest.load(self.manifest.path, fingerprint="v1")
+        loaded = SearchIndex.load(self.dest_dir, "/repo/", manifest, self.state_path)
+        self.assertIsNone(loaded.reset_reason)
+        self.assertIn(self.dest("a.html"), loaded)
+        self.assertEqual(loaded.postings, {"hobbit": {0: 1}})
+        self.assertEqual(loaded.dirty_shards, set())
+
+    def test_state_from_another_build_is_dropped(self):
+        index = self.new_index()
+        index.update(self.dest("a.html"), "A", {"hobbit": 1})
+        index.save(self.manifest.build)
+        # A build without the index ran in between
+        self.manifest.build += 1
+        self.manifest.save()
+
+        manifest = BuildManifest.load(self.manifest.path, fingerprint="v1")
+        loaded = SearchIndex.load(self.dest_dir, "/repo/", manifest, self.state_path)
+        self.assertEqual(
+            loaded.reset_reason, "pages were built without the search index"
+        )
+        self.assertNotIn(self.dest("a.html"), loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
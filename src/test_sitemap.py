@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from sitemap import page_date, page_url, write_feed, write_sitemaps
+
+SITE = "https://example.com"
+
+
+def entry(source, title=None, date=None, mtime_s=0):
+    return {
+        "source": source,
+        "source_mtime_ns": mtime_s * 10**9,
+        "title": title,
+        "date": date,
+    }
+
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.dest_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_dir)
+
+    def pages(self, *rel_paths):
+        return {
+            os.path.join(self.dest_dir, rel_path): entry(rel_path, date="2024-05-01")
+            for rel_path in rel_paths
+        }
+
+    def read(self, name):
+        with open(os.path.join(self.dest_dir, name)) as f:
+            return f.read()
+
+    def test_page_url(self):
+        self.assertEqual(page_url(SITE, "/", "index.html"), "https://example.com/")
+        self.assertEqual(
+            page_url(SITE + "/", "/repo/", os.path.join("blog", "a b", "index.html")),
+            "https://example.com/repo/blog/a%20b/",
+        )
+        self.assertEqual(
+            page_url(SITE, "/", "notes.html"), "https://example.com/notes.html"
+        )
+
+    def test_page_date_prefers_front_matter(self):
+        self.assertEqual(
+            page_date(entry("a.md", date="2024-05-01T10:00:00+02:00")).isoformat(),
+            "2024-05-01T10:00:00+02:00",
+        )
+        self.assertEqual(
+            page_date(entry("a.md", date="2024-05-01")),
+            datetime(2024, 5, 1, tzinfo=timezone.utc),
+        )
+        with self.assertLogs("ssg.sitemap", "WARNING"):
+            fallback = page_date(entry("a.md", date="May 1st", mtime_s=86400))
+        self.assertEqual(fallback, datetime(1970, 1, 2, tzinfo=timezone.utc))
+
+    def test_single_sitemap(self):
+        pages = self.pages("index.html", os.path.join("blog", "index.html"))
+        write_sitemaps(pages, self.dest_dir, SITE, "/")
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<urlset", sitemap)
+        self.assertEqual(sitemap.count("<url>"), 2)
+        self.assertIn(
+            "<url><loc>https://example.com/blog/</loc>"
+            "<lastmod>2024-05-01T00:00:00+00:00</lastmod></url>",
+            sitemap,
+        )
+
+    def test_shards_above_the_limit(self):
+        pages = self.pages("a.html", "b.html", "c.html", "d.html", "e.html")
+        with open(os.path.join(self.dest_dir, "sitemap-7.xml"), "w") as f:
+            f.write("left over")
+        files = write_sitemaps(pages, self.dest_dir, SITE, "/", max_urls=2)
+        self.assertEqual(
+            [os.path.basename(path) for path in files],
+            ["sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml", "sitemap.xml"],
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "sitemap-7.xml")))
+        self.assertEqual(self.read("sitemap-3.xml").count("<url>"), 1)
+        index = self.read("sitemap.xml")
+        self.assertIn("<sitemapindex", index)
+        self.assertIn("<loc>https://example.com/sitemap-2.xml</loc>", index)
+
+    def test_unchanged_sitemap_is_not_rewritten(self):
+        pages = self.pages("index.html")
+        write_sitemaps(pages, self.dest_dir, SITE, "/")
+        path = os.path.join(self.dest_dir, "sitemap.xml")
+        os.utime(path, ns=(1, 1))
+        write_sitemaps(pages, self.dest_dir, SITE, "/")
+        self.assertEqual(os.stat(path).st_mtime_ns, 1)
+        self.assertEqual(os.listdir(self.dest_dir), ["sitemap.xml"])
+
+
+class TestFeed(unittest.TestCase):
+    def setUp(self):
+        self.dest_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dest_dir)
+
+    def test_newest_posts_first(self):
+        pages = {
+            os.path.join(self.dest_dir, "index.html"): entry("index.md", "Home"),
+            os.path.join(self.dest_dir, "blog", "old", "index.html"): entry(
+                "old.md", "Old & dusty", "2020-01-01"
+            ),
+            os.path.join(self.dest_dir, "blog", "new", "index.html"): entry(
+                "new.md", "New", "2024-01-01"
+            ),
+            os.path.join(self.dest_dir, "blog", "mid", "index.html"): entry(
+                "mid.md", "Mid", "2022-01-01"
+            ),
+            os.path.join(self.dest_dir, "contact", "index.html"): entry(
+                "contact.md", "Contact", "2025-01-01"
+            ),
+        }
+        path = write_feed(pages, self.dest_dir, SITE, "/", limit=2)
+        self.assertEqual(path, os.path.join(self.dest_dir, "blog", "feed.xml"))
+        with open(path) as f:
+            feed = f.read()
+        self.assertIn("<title>Home</title>", feed)
+        self.assertLess(feed.index("<title>New</title>"), feed.index("<title>Mid"))
+        self.assertNotIn("Old", feed)
+        self.assertNotIn("Contact", feed)
+        self.assertIn("<pubDate>Mon, 01 Jan 2024 00:00:00 +0000</pubDate>", feed)
+        self.assertIn("<link>https://example.com/blog/new/</link>", feed)
+
+    def test_no_posts_no_feed(self):
+        pages = {os.path.join(self.dest_dir, "index.html"): entry("index.md", "Home")}
+        self.assertIsNone(write_feed(pages, self.dest_dir, SITE, "/"))
+        self.assertEqual(os.listdir(self.dest_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
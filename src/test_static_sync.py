@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from manifest import BuildManifest
+from static_sync import fast_copy, sync_static
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.test_dir, "static")
+        self.dst = os.path.join(self.test_dir, "docs")
+        self.manifest = BuildManifest(os.path.join(self.test_dir, "m.json"), "v1")
+        self.write(self.src, "index.css", "body {}")
+        self.write(self.src, "images/a.png", "png bytes")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, root, rel_path, text):
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dst, rel_path)) as f:
+            return f.read()
+
+    def test_copies_only_new_or_changed_files(self):
+        copied, _ = sync_static(self.src, self.dst, self.manifest)
+        self.assertEqual(copied, ["images/a.png", "index.css"])
+        self.assertEqual(self.read("images/a.png"), "png bytes")
+
+        copied, _ = sync_static(self.src, self.dst, self.manifest)
+        self.assertEqual(copied, [])
+
+        self.write(self.src, "index.css", "body { color: red }")
+        copied, _ = sync_static(self.src, self.dst, self.manifest)
+        self.assertEqual(copied, ["index.css"])
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_removes_deleted_assets_but_keeps_generated_files(self):
+        sync_static(self.src, self.dst, self.manifest)
+        self.write(self.dst, "index.html", "<html></html>")
+        os.remove(os.path.join(self.src, "images/a.png"))
+
+        _, removed = sync_static(self.src, self.dst, self.manifest)
+        self.assertEqual(removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+    def test_removes_deleted_assets_after_manifest_reset(self):
+        sync_static(self.src, self.dst, self.manifest)
+        self.manifest.save()
+        os.remove(os.path.join(self.src, "images/a.png"))
+
+        manifest = BuildManifest.load(self.manifest.path, "v2")
+        _, removed = sync_static(self.src, self.dst, manifest)
+        self.assertEqual(removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+
+    def test_first_sync_over_existing_output_removes_unknown_files(self):
+        self.write(self.dst, "index.html", "<html></html>")
+        self.write(self.dst, "images/old.png", "old bytes")
+
+        _, removed = sync_static(self.src, self.dst, keep=["index.html"])
+        self.assertEqual(removed, ["images/old.png"])
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.html")))
+
+        # With a trusted record of the last sync, dst is not swept
+        sync_static(self.src, self.dst, self.manifest)
+        self.manifest.save()
+        self.write(self.dst, "images/old.png", "old bytes")
+        manifest = BuildManifest.load(self.manifest.path, "v1")
+        _, removed = sync_static(self.src, self.dst, manifest, keep=["index.html"])
+        self.assertEqual(removed, [])
+
+    def test_checksum_detects_same_size_edit(self):
+        sync_static(self.src, self.dst, self.manifest, checksum=True)
+        path = os.path.join(self.src, "index.css")
+        st = os.stat(path)
+        # Touched but unchanged: only copied when comparing by mtime
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(
+            sync_static(self.src, self.dst, self.manifest, checksum=True)[0], []
+        )
+        # Same size, different content: the hash tells them apart
+        with open(path, "w") as f:
+            f.write("body {x")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+        copied, _ = sync_static(self.src, self.dst, self.manifest, checksum=True)
+        self.assertEqual(copied, ["index.css"])
+        self.assertEqual(self.read("index.css"), "body {x")
+
+    def test_checksum_hashes_only_changed_files(self):
+        sync_static(self.src, self.dst, self.manifest, checksum=True)
+        self.write(self.dst, "images/a.png", "png bytez")
+
+        hashed = []
+        with mock.patch(
+            "static_sync.hash_file", side_effect=lambda p: hashed.append(p) or ""
+        ):
+            sync_static(self.src, self.dst, self.manifest, checksum=True)
+        # Untouched sources reuse their recorded hash, and only the copy that
+        # no longer matches its record is read back
+        self.assertEqual(hashed, [os.path.join(self.dst, "images/a.png")])
+
+    def test_fast_copy_preserves_content_and_mtime(self):
+        src_path = os.path.join(self.src, "images/a.png")
+        dst_path = os.path.join(self.test_dir, "copy.png")
+        fast_copy(src_path, dst_path)
+        with open(dst_path) as f:
+            self.assertEqual(f.read(), "png bytes")
+        self.assertEqual(os.stat(dst_path).st_mtime_ns, os.stat(src_path).st_mtime_ns)
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ["copy.png", "static"])
+
+    def test_failed_fast_copy_leaves_no_temporary_file(self):
+        missing = os.path.join(self.src, "missing.png")
+        with self.assertRaises(FileNotFoundError):
+            fast_copy(missing, os.path.join(self.test_dir, "copy.png"))
+        self.assertEqual(os.listdir(self.test_dir), ["static"])
+
+
+if __name__ == "__main__":
+    unittest.main()
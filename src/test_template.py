@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from template import Template, load_template, prefix_root_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>x</p>"),
+            "<title>Hi</title><body><p>x</p></body>",
+        )
+
+    def test_slots_in_any_order_and_repeated(self):
+        template = Template("{{ Content }}|{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="t", Content="c"), "c|t|t")
+
+    def test_unknown_placeholders_are_kept(self):
+        template = Template("{{ Author }} {{ Title }}")
+        self.assertEqual(template.render(Title="t", Content=""), "{{ Author }} t")
+
+    def test_no_placeholders(self):
+        template = Template("<html><body>Static Content Only</body></html>")
+        self.assertEqual(
+            template.render(Title="t", Content="c"),
+            "<html><body>Static Content Only</body></html>",
+        )
+
+    def test_basepath_applied_to_template_only(self):
+        # Content is serialized with the basepath already applied
+        template = Template(
+            '<link href="/index.css" /><a href="//cdn.example/x">{{ Content }}',
+            "/repo/",
+        )
+        self.assertEqual(
+            template.render(Title="", Content='<code>src="/a.png"</code>'),
+            '<link href="/repo/index.css" /><a href="//cdn.example/x">'
+            '<code>src="/a.png"</code>',
+        )
+
+    def test_write_streams_chunked_values(self):
+        template = Template("<body>{{ Content }}</body>", "/repo/")
+        buffer = []
+        template.write(buffer, Content=iter(['<a href="/repo/x">', "x", "</a>"]))
+        self.assertEqual(
+            buffer, ["<body>", '<a href="/repo/x">', "x", "</a>", "</body>"]
+        )
+
+    def test_prefix_root_urls_root_basepath_is_noop(self):
+        html = '<a href="/x">x</a>'
+        self.assertIs(prefix_root_urls(html, "/"), html)
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "template.html")
+        with open(self.path, "w") as f:
+            f.write("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_cached_until_file_changes(self):
+        first = load_template(self.path)
+        self.assertIs(load_template(self.path), first)
+        self.assertIsNot(load_template(self.path, "/repo/"), first)
+
+        with open(self.path, "w") as f:
+            f.write('<h2 class="t">{{ Title }}</h2>')
+        self.assertEqual(
+            load_template(self.path).render(Title="t"), '<h2 class="t">t</h2>'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -85,6 +85,14 @@ class TestTextNode(unittest.TestCase):
         ):
             text_node_to_html_node(node)
 
+    def test_invalid_unhashable_type(self):
+        node = TextNode("abc", ["bold"])
+        with self.assertRaises(ValueError):
+            text_node_to_html_node(node)
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("abc", TextType.TEXT), "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from watch import InotifyWatcher, PollingWatcher
+
+
+class WatcherTests:
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.content = os.path.join(self.test_dir, "content")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.page = os.path.join(self.content, "blog", "index.md")
+        self.template = os.path.join(self.test_dir, "template.html")
+        self.other = os.path.join(self.test_dir, "README.md")
+        for path in (self.page, self.template, self.other):
+            with open(path, "w") as f:
+                f.write("x")
+        self.watcher = self.make_watcher([self.content, self.template])
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.wait(timeout=0.05), set())
+
+    def test_reports_edited_file(self):
+        with open(self.page, "a") as f:
+            f.write("more")
+        self.assertIn(self.page, self.watcher.wait(timeout=2))
+
+    def test_reports_template_but_not_its_neighbours(self):
+        with open(self.other, "a") as f:
+            f.write("more")
+        self.assertEqual(self.watcher.wait(timeout=0.05), set())
+        with open(self.template, "a") as f:
+            f.write("more")
+        self.assertEqual(self.watcher.wait(timeout=2), {self.template})
+
+    def test_reports_files_in_new_directory(self):
+        new_dir = os.path.join(self.content, "new")
+        os.makedirs(new_dir)
+        new_page = os.path.join(new_dir, "index.md")
+        with open(new_page, "w") as f:
+            f.write("# New")
+        changed = self.watcher.wait(timeout=2)
+        if new_page not in changed:
+            changed |= self.watcher.wait(timeout=2)
+        self.assertIn(new_page, changed)
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def make_watcher(self, paths):
+        return PollingWatcher(paths, interval=0.01)
+
+    def test_reports_deleted_file(self):
+        os.remove(self.page)
+        self.assertIn(self.page, self.watcher.wait(timeout=2))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def make_watcher(self, paths):
+        return InotifyWatcher(paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+import log
+
+logger = log.get_logger("watch")
+
+# Flags from linux/inotify.h
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Editors save in bursts (write, rename, chmod...), so keep collecting events
+# for this long after the first one before rebuilding
+SETTLE_SECONDS = 0.1
+
+
+class PollingWatcher:
+    # Portable fallback: compare (size, mtime) snapshots of the watched trees
+    def __init__(self, paths, interval=0.5):
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for root in self.paths:
+            if os.path.isfile(root):
+                st = os.stat(root)
+                snapshot[root] = (st.st_size, st.st_mtime_ns)
+                continue
+            for dir_path, _, file_names in os.walk(root):
+                snapshot[dir_path] = None
+                for name in file_names:
+                    path = os.path.join(dir_path, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path, -1) != self.snapshot.get(path, -1)
+            }
+            self.snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Linux inotify through libc, so watching needs no third-party package.
+    # Directories are watched recursively; a file root (the template) is
+    # watched through its parent directory because editors often replace
+    # the file instead of writing to it in place.
+    def __init__(self, paths):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor -> directory path
+        # Watched file roots; other names in their directories are ignored
+        self.files = set()
+        self.file_dirs = set()
+        try:
+            for root in paths:
+                if os.path.isdir(root):
+                    self.add_tree(root)
+                else:
+                    self.files.add(os.path.normpath(root))
+                    parent = os.path.dirname(root) or "."
+                    self.file_dirs.add(os.path.normpath(parent))
+                    self.add_dir(parent)
+        except BaseException:
+            self.close()
+            raise
+
+    def add_dir(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch '{path}'")
+        self.dirs[wd] = path
+
+    def add_tree(self, root):
+        for dir_path, _, _ in os.walk(root):
+            self.add_dir(dir_path)
+
+    def read_events(self):
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: report only the watched directories,
+                # which tells the caller to check every page
+                changed.update(self.dirs.values())
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if os.path.normpath(directory) in self.file_dirs:
+                if os.path.normpath(path) not in self.files:
+                    continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New subdirectory: watch it, and report whatever it already
+                # holds (e.g. a directory moved in with files)
+                try:
+                    self.add_tree(path)
+                except OSError:
+                    pass  # already gone again; its DELETE event follows
+                for dir_path, _, file_names in os.walk(path):
+                    changed.update(os.path.join(dir_path, n) for n in file_names)
+            changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = self.read_events()
+        while select.select([self.fd], [], [], SETTLE_SECONDS)[0]:
+            changed |= self.read_events()
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def make_watcher(paths, poll_interval=0.5, use_inotify=True):
+    if use_inotify:
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as e:
+            logger.warning(
+                "inotify unavailable (%s); polling every %ss", e, poll_interval
+            )
+    return PollingWatcher(paths, poll_interval)
+
+
+def watch(paths, on_change, poll_interval=0.5, use_inotify=True):
+    # Calls on_change(changed_paths) after every burst of changes until
+    # interrupted with Ctrl+C
+    watcher = make_watcher(paths, poll_interval, use_inotify)
+    logger.info("Watching %s for changes. Press Ctrl+C to stop.", ", ".join(paths))
+    try:
+        while True:
+            changed = watcher.wait()
+            if not changed:
+                continue
+            # A broken page should not end the session: report it and keep
+            # watching so the next save can fix it
+            try:
+                on_change(changed)
+            except Exception:
+                logger.exception(
+                    "Rebuild failed", extra=log.fields(event="rebuild_failed")
+                )
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")
+    finally:
+        watcher.close()